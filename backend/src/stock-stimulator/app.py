@@ -3,6 +3,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from market_simulator import MarketSimulator, create_sample_simulation
+from checkpoint import checkpoint_simulation, restore_simulation
 from money_flow_viz import MoneyFlowVisualizer
 
 def main():
@@ -32,6 +33,12 @@ def main():
         retail_fomo = st.slider("Retail FOMO Factor", 0.1, 2.0, 0.7)
         
         simulate_button = st.button("Run Simulation")
+        
+        # Continue the last run from its checkpoint instead of starting over
+        st.subheader("Extend Last Run")
+        extend_days = st.slider("Additional Days", 10, 365, 30)
+        extend_button = st.button("Extend Simulation",
+                                  disabled=st.session_state.get('sim_checkpoint') is None)
     
     # Main panel - initially show explanation
     if 'simulation_run' not in st.session_state:
@@ -96,7 +103,7 @@ def main():
             # Add institutional investors
             for i in range(num_inst):
                 capital = 5000000 + np.random.random() * 15000000  # $5M-$20M
-                sim.add_institutional_investor(f"Inst_{i}", capital)
+                sim.add_institutional_investor(f"Inst_{i}", capital, aggression=inst_aggression)
             
             # Add retail investors
             for i in range(num_retail):
@@ -111,6 +118,16 @@ def main():
             st.session_state.simulation_run = True
             st.session_state.sim_data = data
             st.session_state.stock_names = list(sim.stocks.keys())
+            st.session_state.sim_checkpoint = checkpoint_simulation(sim)
+    
+    # Extend the previous run when requested
+    if extend_button and st.session_state.get('sim_checkpoint') is not None:
+        with st.spinner("Extending simulation..."):
+            sim = restore_simulation(st.session_state.sim_checkpoint)
+            data = sim.run_simulation(extend_days)
+            
+            st.session_state.sim_data = data
+            st.session_state.sim_checkpoint = checkpoint_simulation(sim)
     
     # Display simulation results if available
     if st.session_state.simulation_run and st.session_state.sim_data is not None:
@@ -0,0 +1,184 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import matplotlib
+matplotlib.use("Agg")  # Benchmarks run headless
+from market_simulator import MarketSimulator
+from vectorized_simulator import VectorizedMarketSimulator
+from enhanced_money_flow import EnhancedMoneyFlowAnalyzer
+from money_flow_viz import MoneyFlowVisualizer
+from profiling import SimulationProfiler
+
+ENGINES = {'object': MarketSimulator, 'vectorized': VectorizedMarketSimulator}
+
+# (engine, institutional, retail, stocks, days) per preset
+SCALES = {
+    'small': [('object', 5, 50, 3, 120),
+              ('vectorized', 5, 50, 3, 120)],
+    'medium': [('object', 10, 200, 10, 365),
+               ('vectorized', 10, 200, 10, 365),
+               ('vectorized', 100, 100000, 10, 365)],
+    'large': [('object', 20, 1000, 10, 730),
+              ('vectorized', 1000, 1000000, 50, 730)],
+}
+
+
+class Scenario:
+    def __init__(self, engine, n_inst, n_retail, n_stocks, days):
+        self.engine = engine
+        self.n_inst = n_inst
+        self.n_retail = n_retail
+        self.n_stocks = n_stocks
+        self.days = days
+
+    @property
+    def name(self):
+        return f"{self.engine}-i{self.n_inst}-r{self.n_retail}-s{self.n_stocks}-d{self.days}"
+
+    def build(self, seed=0):
+        sim = ENGINES[self.engine](seed)
+        for i in range(self.n_stocks):
+            sim.add_stock(f"S{i}", 25 + sim.rng.random() * 175, 0.015 * (0.8 + sim.rng.random() * 0.4))
+        for i in range(self.n_inst):
+            sim.add_institutional_investor(f"Inst_{i}", 10000000)
+        fomo = 0.7 * (0.7 + sim.rng.random(self.n_retail) * 0.6)
+        if self.engine == 'vectorized':
+            sim.add_retail_investors(fomo, 100000)
+        else:
+            for i, fomo_factor in enumerate(fomo):
+                sim.add_retail_investor(f"Retail_{i}", 100000, fomo_factor)
+        return sim
+
+
+def _run_phases(scenario):
+    """Run every benchmarked phase once and return {phase: seconds}"""
+    timings = {}
+    sim = scenario.build()
+    sim.profiler = SimulationProfiler()
+
+    start = time.perf_counter()
+    sim.run_simulation(scenario.days)
+    timings['simulate'] = time.perf_counter() - start
+
+    # Break the simulate phase down by the simulator's own day phases
+    for phase, stats in sim.profiler.report()['phases'].items():
+        timings[f'simulate.{phase}'] = stats['total_s']
+
+    start = time.perf_counter()
+    data = sim.get_data_frame()
+    timings['to_frame'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    EnhancedMoneyFlowAnalyzer(data).calculate_wealth_transfer_metrics()
+    timings['analyze'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    visualizer = MoneyFlowVisualizer(data)
+    for stock_name in sim.stocks:
+        visualizer.detect_pump_and_dump(stock_name)
+    timings['detect'] = time.perf_counter() - start
+    return timings
+
+
+def run_scenario(scenario, repeat=3):
+    """Best-of-`repeat` phase timings plus peak traced memory"""
+    best = None
+    for _ in range(repeat):
+        timings = _run_phases(scenario)
+        best = timings if best is None else {k: min(v, timings[k]) for k, v in best.items()}
+
+    # Separate pass so tracing overhead does not distort the timings
+    tracemalloc.start()
+    _run_phases(scenario)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'days_per_sec': scenario.days / best['simulate'],
+        'phases': best,
+        'peak_mb': peak / 2**20,
+    }
+
+
+def _slower(seconds, base_seconds, threshold, min_seconds):
+    # Both a relative and an absolute slowdown: short timings swing by well
+    # over the relative threshold on a busy machine
+    return seconds > base_seconds * (1 + threshold) and seconds - base_seconds > min_seconds
+
+
+def compare(results, baseline, threshold, min_seconds=0.05):
+    """List regressions worse than `threshold` (relative) and `min_seconds` (absolute) against a baseline"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        if _slower(result['phases']['simulate'], base['phases']['simulate'], threshold, min_seconds):
+            regressions.append(f"{name}: days/sec {result['days_per_sec']:.1f} "
+                               f"vs baseline {base['days_per_sec']:.1f}")
+        for phase, seconds in result['phases'].items():
+            base_seconds = base['phases'].get(phase)
+            if phase == 'simulate' or '.' in phase or base_seconds is None:
+                continue  # simulate is covered by days/sec; its day phases are only reported
+            if _slower(seconds, base_seconds, threshold, min_seconds):
+                regressions.append(f"{name}: {phase} {seconds:.4f}s vs baseline {base_seconds:.4f}s")
+        if result['peak_mb'] > base['peak_mb'] * (1 + threshold):
+            regressions.append(f"{name}: peak memory {result['peak_mb']:.1f}MB "
+                               f"vs baseline {base['peak_mb']:.1f}MB")
+    return regressions
+
+
+def _scenarios(args):
+    if args.retail or args.stocks or args.days:
+        grid = itertools.product(args.engine or ['object', 'vectorized'], args.inst or [5],
+                                 args.retail or [50], args.stocks or [3], args.days or [120])
+        return [Scenario(*params) for params in grid]
+    return [Scenario(*params) for params in SCALES[args.scale]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the market simulator and analyzers")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--engine", nargs="+", choices=sorted(ENGINES))
+    parser.add_argument("--inst", nargs="+", type=int)
+    parser.add_argument("--retail", nargs="+", type=int)
+    parser.add_argument("--stocks", nargs="+", type=int)
+    parser.add_argument("--days", nargs="+", type=int)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative slowdown before failing")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Slowdowns smaller than this many seconds never fail")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scenario in _scenarios(args):
+        result = run_scenario(scenario, args.repeat)
+        results[scenario.name] = result
+        phases = "  ".join(f"{k}={v * 1000:.1f}ms" for k, v in result['phases'].items())
+        print(f"{scenario.name:45s} {result['days_per_sec']:10.1f} days/s  "
+              f"peak={result['peak_mb']:.1f}MB  {phases}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from sweep import DEFAULT_PARAMS, INTEGER_PARAMS, build_simulation
+
+# Statistics of daily log returns the calibration matches
+TARGET_STATS = ('mean', 'std', 'skew', 'kurtosis', 'acf1', 'abs_acf1')
+
+# Tolerance each statistic's error is divided by before squaring
+STAT_SCALES = {'mean': 0.001, 'std': 0.002, 'skew': 0.5, 'kurtosis': 1.0, 'acf1': 0.05, 'abs_acf1': 0.05}
+
+# Default search ranges for the calibrated parameters
+CALIBRATION_BOUNDS = {
+    'avg_volatility': (0.005, 0.05),
+    'retail_fomo': (0.1, 2.0),
+    'panic_factor': (0.1, 1.5),
+    'accumulation_days': (5, 40),
+    'pump_days': (3, 20),
+    'distribution_days': (3, 30),
+}
+
+
+def return_statistics(prices):
+    """TARGET_STATS of daily log returns, averaged over stocks.
+
+    `prices` is a (days, stocks) array or DataFrame of closing prices, so
+    the same function measures observed market data and simulated runs.
+    """
+    prices = np.asarray(prices, dtype=float)
+    if prices.ndim == 1:
+        prices = prices[:, None]
+    returns = np.diff(np.log(prices), axis=0)
+    centered = returns - returns.mean(axis=0)
+    std = returns.std(axis=0)
+    safe_std = np.where(std > 0, std, 1.0)
+    z = centered / safe_std
+    abs_centered = np.abs(returns) - np.abs(returns).mean(axis=0)
+    abs_var = (abs_centered ** 2).mean(axis=0)
+    stats = np.array([
+        returns.mean(axis=0),
+        std,
+        (z ** 3).mean(axis=0),
+        (z ** 4).mean(axis=0) - 3,
+        (z[1:] * z[:-1]).mean(axis=0),
+        (abs_centered[1:] * abs_centered[:-1]).mean(axis=0) / np.where(abs_var > 0, abs_var, 1.0),
+    ])
+    return dict(zip(TARGET_STATS, stats.mean(axis=1).tolist()))
+
+
+def _simulate_statistics(params, seeds):
+    """Worker entry point: statistics of one candidate averaged over the shared seeds"""
+    rows = []
+    for seed in seeds:
+        sim = build_simulation(params, seed)
+        sim.run_simulation({**DEFAULT_PARAMS, **params}['days'])
+        stats = return_statistics(sim.money_flow.metric('price'))
+        rows.append([stats[name] for name in TARGET_STATS])
+    return np.mean(rows, axis=0)
+
+
+class CMAES:
+    """Minimal (mu/mu_w, lambda) CMA-ES minimizer on the unit hypercube"""
+
+    def __init__(self, dim, sigma=0.3, population=None, seed=None, mean=None):
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+        self.population = population or 4 + int(3 * np.log(dim))
+        self.mu = self.population // 2
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mu_eff = 1 / (self.weights ** 2).sum()
+
+        # Standard strategy parameter settings (Hansen's tutorial)
+        self.c_sigma = (self.mu_eff + 2) / (dim + self.mu_eff + 5)
+        self.d_sigma = 1 + 2 * max(0, np.sqrt((self.mu_eff - 1) / (dim + 1)) - 1) + self.c_sigma
+        self.c_c = (4 + self.mu_eff / dim) / (dim + 4 + 2 * self.mu_eff / dim)
+        self.c_1 = 2 / ((dim + 1.3) ** 2 + self.mu_eff)
+        self.c_mu = min(1 - self.c_1, 2 * (self.mu_eff - 2 + 1 / self.mu_eff) / ((dim + 2) ** 2 + self.mu_eff))
+        self.chi_n = np.sqrt(dim) * (1 - 1 / (4 * dim) + 1 / (21 * dim ** 2))
+
+        self.mean = np.full(dim, 0.5) if mean is None else np.asarray(mean, dtype=float)
+        self.sigma = sigma
+        self.cov = np.eye(dim)
+        self.p_sigma = np.zeros(dim)
+        self.p_c = np.zeros(dim)
+        self.generation = 0
+
+    def ask(self):
+        """Candidate points for this generation, clipped to [0, 1]"""
+        eigenvalues, eigenvectors = np.linalg.eigh(self.cov)
+        self._sqrt_cov = eigenvectors * np.sqrt(np.maximum(eigenvalues, 1e-20))
+        self._inv_sqrt_cov = eigenvectors / np.sqrt(np.maximum(eigenvalues, 1e-20)) @ eigenvectors.T
+        z = self.rng.standard_normal((self.population, self.dim))
+        self._steps = z @ self._sqrt_cov.T
+        return np.clip(self.mean + self.sigma * self._steps, 0.0, 1.0)
+
+    def tell(self, losses):
+        """Update the search distribution from the losses of the last ask()"""
+        order = np.argsort(losses)[:self.mu]
+        step = self.weights @ self._steps[order]
+        self.mean = np.clip(self.mean + self.sigma * step, 0.0, 1.0)
+
+        self.p_sigma = ((1 - self.c_sigma) * self.p_sigma
+                        + np.sqrt(self.c_sigma * (2 - self.c_sigma) * self.mu_eff) * self._inv_sqrt_cov @ step)
+        self.generation += 1
+        h_sigma = (np.linalg.norm(self.p_sigma) / np.sqrt(1 - (1 - self.c_sigma) ** (2 * self.generation))
+                   < (1.4 + 2 / (self.dim + 1)) * self.chi_n)
+        self.p_c = (1 - self.c_c) * self.p_c + h_sigma * np.sqrt(self.c_c * (2 - self.c_c) * self.mu_eff) * step
+
+        rank_mu = (self._steps[order].T * self.weights) @ self._steps[order]
+        self.cov = ((1 - self.c_1 - self.c_mu) * self.cov
+                    + self.c_1 * (np.outer(self.p_c, self.p_c)
+                                  + (1 - h_sigma) * self.c_c * (2 - self.c_c) * self.cov)
+                    + self.c_mu * rank_mu)
+        self.sigma *= np.exp((self.c_sigma / self.d_sigma) * (np.linalg.norm(self.p_sigma) / self.chi_n - 1))
+
+
+class CalibrationResult:
+    def __init__(self, best_params, best_loss, best_stats, history):
+        self.best_params = best_params
+        self.best_loss = best_loss
+        self.best_stats = best_stats
+        self.history = history  # One dict per generation
+
+
+def _to_params(point, bounds, base_params):
+    params = dict(base_params)
+    for value, (name, (low, high)) in zip(point.tolist(), bounds.items()):
+        value = low + value * (high - low)
+        params[name] = int(round(value)) if name in INTEGER_PARAMS else value
+    return params
+
+
+def calibrate(targets, bounds=None, base_params=None, seeds=range(8), generations=30,
+              population=None, sigma=0.3, weights=None, seed=None, workers=None):
+    """Fit simulator parameters to target return statistics with CMA-ES.
+
+    `targets` maps names from TARGET_STATS (e.g. from `return_statistics`
+    on observed prices) to values; the loss is the weighted sum of squared
+    differences, each divided by its STAT_SCALES tolerance. Every candidate in
+    every generation is simulated with the same `seeds` (common random
+    numbers), so differences in loss reflect the parameters rather than
+    sampling noise. Each generation's candidates run in parallel.
+    """
+    bounds = dict(bounds or CALIBRATION_BOUNDS)
+    base_params = {**DEFAULT_PARAMS, **(base_params or {})}
+    seeds = [int(s) for s in seeds]
+    names = [name for name in TARGET_STATS if name in targets]
+    target = np.array([targets[name] for name in names])
+    columns = [TARGET_STATS.index(name) for name in names]
+    weights = np.array([1.0 if weights is None else weights.get(name, 1.0) for name in names])
+    scale = np.array([STAT_SCALES[name] for name in names])
+
+    optimizer = CMAES(len(bounds), sigma, population, seed)
+    workers = workers or os.cpu_count() or 1
+    best = (np.inf, None, None)
+    history = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for generation in range(generations):
+            candidates = [_to_params(point, bounds, base_params) for point in optimizer.ask()]
+            if pool is None:
+                stats = list(map(_simulate_statistics, candidates, [seeds] * len(candidates)))
+            else:
+                stats = list(pool.map(_simulate_statistics, candidates, [seeds] * len(candidates)))
+            losses = np.array([(weights * ((s[columns] - target) / scale) ** 2).sum() for s in stats])
+            optimizer.tell(losses)
+
+            i = int(np.argmin(losses))
+            if losses[i] < best[0]:
+                best = (losses[i], candidates[i], dict(zip(TARGET_STATS, stats[i].tolist())))
+            history.append({'generation': generation, 'best_loss': best[0],
+                            'generation_loss': losses[i], 'sigma': optimizer.sigma})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return CalibrationResult(best[1], best[0], best[2], history)
+
+
+if __name__ == "__main__":
+    observed = return_statistics(build_simulation({'avg_volatility': 0.02, 'retail_fomo': 1.2}, 123)
+                                 .run_simulation(250).filter(like='_price').values)
+    result = calibrate(observed, base_params={"days": 250}, generations=10, seeds=range(4))
+    print(result.best_params)
+    print(result.best_loss, result.best_stats)
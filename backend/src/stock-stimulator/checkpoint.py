@@ -0,0 +1,61 @@
+import pickle
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_simulation(sim):
+    """Serialize the full simulator state to bytes.
+
+    The snapshot covers stocks, agent phases, the RNG state and the output
+    recorded so far, so a restored simulator continues exactly where this
+    one stopped.
+    """
+    return pickle.dumps({'version': CHECKPOINT_VERSION, 'simulator': sim},
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def restore_simulation(data):
+    """Rebuild a simulator from checkpoint_simulation bytes.
+
+    Nothing on disk is touched: an attached event log comes back detached
+    and needs `sim.event_log.resume(path)` before the simulator runs on.
+    """
+    payload = pickle.loads(data)
+    if payload.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {payload.get('version')}")
+    return payload['simulator']
+
+
+def save_checkpoint(sim, path):
+    with open(path, 'wb') as f:
+        f.write(checkpoint_simulation(sim))
+
+
+def load_checkpoint(path):
+    with open(path, 'rb') as f:
+        return restore_simulation(f.read())
+
+
+def fork_simulation(sim, seed=None, event_log_path=None):
+    """Independent copy of `sim` for what-if branches.
+
+    Without a seed the branch replays the parent's future exactly; with a
+    seed it diverges from the shared checkpoint onwards. A simulation that
+    writes an event log needs `event_log_path`: the branch continues in a
+    copy of the log there, since two timelines cannot share one file.
+    """
+    if getattr(sim, 'event_log', None) is not None and event_log_path is None:
+        raise ValueError("The simulation writes an event log; pass event_log_path for the branch's copy")
+    branch = restore_simulation(checkpoint_simulation(sim))
+    if getattr(branch, 'event_log', None) is not None:
+        branch.event_log.resume(event_log_path)
+    if seed is not None:
+        seed_sequence = np.random.SeedSequence(seed)
+        branch.rng = np.random.default_rng(seed_sequence)
+        # Shocks buffered from the parent's generator would delay the divergence
+        if getattr(branch, 'shock_model', None) is not None:
+            branch.shock_model.reset()
+        if getattr(branch, 'intraday', None) is not None:
+            branch.intraday.rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    return branch
@@ -0,0 +1,76 @@
+"""Cohort-aggregated retail populations.
+
+Retail investors differ only by FOMO factor and capital, and capital does
+not enter their decisions. Sorting the population by FOMO and splitting it
+into equal-size cohorts lets the simulators evaluate one representative
+RetailInvestor per cohort, weighted by the cohort size, so the daily cost
+depends on the number of cohorts rather than the number of investors.
+
+Error bound: on a given day let `t` be the largest absolute 4-day trend
+across stocks and `a` the largest absolute retail action. Within a cohort
+spanning FOMO factors [low, high], an investor that focuses on the same
+stock as the cohort representative differs from it by at most
+`t * (high - low)`, since the response is linear in FOMO with slope at most
+`t`. The focus stock can only differ in the cohorts containing a switching
+threshold (at most one per competing candidate stock, so at most two), and
+there the difference is at most `2 * a`. Each stock's average retail demand
+therefore stays within
+
+    t * max(high - low) + 2 * 2 * a * max(cohort share)
+
+of the agent-level RetailInvestor result; `RetailCohorts.error_bound`
+evaluates this. With 256 equal-size cohorts the second term is about 1.6%
+of the largest action and the first is typically far smaller.
+"""
+import numpy as np
+
+
+class RetailCohorts:
+    """Representative FOMO factor, size and capital of each retail cohort"""
+
+    def __init__(self, fomo, size, capital, low, high):
+        self.fomo = fomo
+        self.size = size
+        self.capital = capital
+        self.low = low
+        self.high = high
+
+    def __len__(self):
+        return len(self.fomo)
+
+    @property
+    def population(self):
+        return int(self.size.sum())
+
+    def error_bound(self, max_trend, max_action):
+        """Worst-case error in any stock's average retail demand for one day"""
+        max_width = (self.high - self.low).max()
+        max_share = self.size.max() / self.size.sum()
+        return max_trend * max_width + 4 * max_action * max_share
+
+
+def bucket_retail_population(fomo_factors, n_cohorts=256, capital=100000):
+    """Split a retail population into `n_cohorts` equal-size FOMO cohorts.
+
+    `capital` may be a scalar or one value per investor; each cohort's
+    representative gets the mean FOMO factor and mean capital of its members.
+    """
+    fomo_factors = np.asarray(fomo_factors, dtype=float)
+    capital = np.broadcast_to(np.asarray(capital, dtype=float), fomo_factors.shape)
+
+    order = np.argsort(fomo_factors, kind='stable')
+    sorted_fomo = fomo_factors[order]
+    sorted_capital = capital[order]
+
+    n_cohorts = max(1, min(n_cohorts, len(sorted_fomo)))
+    bounds = np.linspace(0, len(sorted_fomo), n_cohorts + 1).astype(int)
+    starts, ends = bounds[:-1], bounds[1:]
+    size = ends - starts
+
+    return RetailCohorts(
+        fomo=np.add.reduceat(sorted_fomo, starts) / size,
+        size=size,
+        capital=np.add.reduceat(sorted_capital, starts) / size,
+        low=sorted_fomo[starts],
+        high=sorted_fomo[ends - 1],
+    )
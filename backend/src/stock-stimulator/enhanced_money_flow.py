@@ -3,69 +3,146 @@ import seaborn as sns
 import pandas as pd
 import numpy as np
 from matplotlib.patches import Patch
+from regimes import selling_thresholds, segment_regimes
+
+FORWARD_WINDOWS = (5, 10, 20)
+
+# Columns every stock has in the simulation frame
+INPUT_METRICS = ('price', 'inst_flow', 'retail_flow')
+
+# Derived metrics: name -> (dependencies, function of the dependency blocks).
+# Functions take and return (days, stocks) arrays, so one call serves one
+# stock or many.
+DERIVED_METRICS = {}
+
+
+def derived_metric(name, *dependencies):
+    """Register a derived metric computed from input or other derived metrics"""
+    def register(func):
+        DERIVED_METRICS[name] = (dependencies, func)
+        return func
+    return register
+
+
+def _forward_change(price, window):
+    """price[t + window] / price[t] - 1, NaN where the window runs past the end"""
+    change = np.full(price.shape, np.nan)
+    if window < len(price):
+        change[:-window] = price[window:] / price[:-window] - 1
+    return change
+
+
+@derived_metric('wealth_transfer', 'inst_flow', 'retail_flow')
+def _wealth_transfer(inst_flow, retail_flow):
+    # Strategic timing advantage: institutions sell while retail buys
+    return -inst_flow * ((retail_flow > 0) & (inst_flow < 0))
+
+
+@derived_metric('cum_wealth_transfer', 'wealth_transfer')
+def _cum_wealth_transfer(wealth_transfer):
+    return np.cumsum(wealth_transfer, axis=0)
+
+
+@derived_metric('heavy_inst_selling', 'inst_flow')
+def _heavy_inst_selling(inst_flow):
+    # Days in the top 10% of institutional selling
+    return (inst_flow <= selling_thresholds(inst_flow, 10)).astype(np.int64)
+
+
+@derived_metric('retail_buying_into_selling', 'retail_flow', 'heavy_inst_selling')
+def _retail_buying_into_selling(retail_flow, heavy_inst_selling):
+    return retail_flow * heavy_inst_selling
+
+
+# Price change and retail value change N days after each day
+for _window in FORWARD_WINDOWS:
+    derived_metric(f'price_change_{_window}d', 'price')(
+        lambda price, window=_window: _forward_change(price, window))
+    derived_metric(f'retail_value_change_{_window}d', 'retail_buying_into_selling', f'price_change_{_window}d')(
+        lambda buying, change: buying * change)
+
 
 class EnhancedMoneyFlowAnalyzer:
+    """Wealth-transfer analysis of a simulation frame.
+
+    Metrics are computed on first access, for just the stocks asked for,
+    and memoized in a side store; the simulation frame is never modified.
+    """
+
     def __init__(self, simulation_data):
         self.data = simulation_data
-        self.calculate_wealth_transfer_metrics()
-        
-    def calculate_wealth_transfer_metrics(self):
-        """Calculate metrics related to wealth transfer from retail to institutional investors"""
-        # Process each stock in the dataset
-        stock_columns = [col.split('_')[0] for col in self.data.columns 
-                         if col.endswith('_price')]
-        
-        for stock_name in stock_columns:
-            # 1. Calculate the strategic timing advantage
-            # When institutions sell and retailers buy at the same time
-            self.data[f'{stock_name}_wealth_transfer'] = (
-                -1 * self.data[f'{stock_name}_inst_flow'] * 
-                np.where(self.data[f'{stock_name}_retail_flow'] > 0, 1, 0) *
-                np.where(self.data[f'{stock_name}_inst_flow'] < 0, 1, 0)
-            )
-            
-            # 2. Calculate cumulative wealth transfer
-            self.data[f'{stock_name}_cum_wealth_transfer'] = self.data[f'{stock_name}_wealth_transfer'].cumsum()
-            
-            # 3. Calculate retail buying at institutional selling peaks
-            # Get top 10% of institutional selling days
-            inst_sell_threshold = np.percentile(
-                self.data[self.data[f'{stock_name}_inst_flow'] < 0][f'{stock_name}_inst_flow'], 10)
-            
-            # Flag days with heavy institutional selling
-            self.data[f'{stock_name}_heavy_inst_selling'] = np.where(
-                self.data[f'{stock_name}_inst_flow'] <= inst_sell_threshold, 1, 0)
-            
-            # Calculate retail buying during heavy institutional selling
-            self.data[f'{stock_name}_retail_buying_into_selling'] = (
-                self.data[f'{stock_name}_retail_flow'] * 
-                self.data[f'{stock_name}_heavy_inst_selling']
-            )
-            
-            # 4. Calculate value capture/loss 5 and 10 days after heavy institutional selling
-            window_sizes = [5, 10, 20]
-            for window in window_sizes:
-                # Calculate price change N days after each point
-                self.data[f'{stock_name}_price_change_{window}d'] = self.data[f'{stock_name}_price'].pct_change(periods=window).shift(-window)
-                
-                # Calculate retail value change after institutional selling
-                self.data[f'{stock_name}_retail_value_change_{window}d'] = (
-                    self.data[f'{stock_name}_retail_buying_into_selling'] * 
-                    self.data[f'{stock_name}_price_change_{window}d']
-                )
+        self.stock_names = [col[:-len('_price')] for col in self.data.columns if col.endswith('_price')]
+        self._cache = {}     # (stock, metric) -> (days,) array
+        self._segments = {}  # stock -> regime runs
+
+    def calculate_wealth_transfer_metrics(self, stock_names=None):
+        """Compute every derived metric for `stock_names` (default all) in one pass"""
+        for name in DERIVED_METRICS:
+            self.block(name, stock_names)
+
+    def block(self, name, stock_names=None):
+        """(days, stocks) array of one metric, computing what is not cached yet"""
+        stock_names = self.stock_names if stock_names is None else list(stock_names)
+        if name in INPUT_METRICS:
+            return self.data[[f'{stock_name}_{name}' for stock_name in stock_names]].to_numpy(dtype=float)
+        dependencies, func = DERIVED_METRICS[name]
+        missing = [stock_name for stock_name in stock_names if (stock_name, name) not in self._cache]
+        if missing:
+            values = func(*(self.block(dependency, missing) for dependency in dependencies))
+            for j, stock_name in enumerate(missing):
+                self._cache[stock_name, name] = values[:, j]
+        return np.column_stack([self._cache[stock_name, name] for stock_name in stock_names])
+
+    def metric(self, stock_name, name):
+        """One stock's metric as a Series aligned with the simulation frame"""
+        return pd.Series(self.block(name, [stock_name])[:, 0], index=self.data.index, name=f'{stock_name}_{name}')
+
+    def stock_frame(self, stock_name, names):
+        """Date plus the named metrics of one stock, with unprefixed column names"""
+        frame = pd.DataFrame({'date': self.data['date']})
+        for name in names:
+            frame[name] = self.metric(stock_name, name)
+        return frame
+
+    def segments(self, stock_names=None):
+        """Accumulation, pump and distribution runs, segmented once per stock"""
+        stock_names = self.stock_names if stock_names is None else list(stock_names)
+        missing = [stock_name for stock_name in stock_names if stock_name not in self._segments]
+        if missing:
+            runs = segment_regimes(self.block('price', missing), self.block('inst_flow', missing),
+                                   self.block('retail_flow', missing), missing, self.data['date'].to_numpy())
+            groups = dict(tuple(runs.groupby('stock', sort=False)))
+            for stock_name in missing:
+                self._segments[stock_name] = groups.get(stock_name, runs.iloc[:0])
+        return pd.concat([self._segments[stock_name] for stock_name in stock_names], ignore_index=True)
+
+    def to_long(self, names=None, stock_names=None):
+        """Tidy frame with one row per (date, stock) and one column per metric"""
+        stock_names = self.stock_names if stock_names is None else list(stock_names)
+        names = INPUT_METRICS + tuple(DERIVED_METRICS) if names is None else names
+        days, stocks = len(self.data), len(stock_names)
+        long = pd.DataFrame({
+            'date': np.repeat(self.data['date'].to_numpy(), stocks),
+            'stock': np.tile(stock_names, days),
+        })
+        for name in names:
+            long[name] = self.block(name, stock_names).ravel()
+        return long
     
     def plot_wealth_transfer(self, stock_name):
         """Plot wealth transfer dynamics for a specific stock"""
+        data = self.stock_frame(stock_name, ('price', 'heavy_inst_selling', 'wealth_transfer',
+                                             'cum_wealth_transfer'))
         fig, axes = plt.subplots(3, 1, figsize=(12, 18), sharex=True)
         
         # 1. Price chart with institutional selling highlighted
-        axes[0].plot(self.data['date'], self.data[f'{stock_name}_price'], 
+        axes[0].plot(data['date'], data['price'], 
                     color='black', linewidth=2, label='Price')
         
         # Highlight periods of heavy institutional selling
-        sell_periods = self.data[self.data[f'{stock_name}_heavy_inst_selling'] == 1]
+        sell_periods = data[data['heavy_inst_selling'] == 1]
         if not sell_periods.empty:
-            axes[0].scatter(sell_periods['date'], sell_periods[f'{stock_name}_price'], 
+            axes[0].scatter(sell_periods['date'], sell_periods['price'], 
                            color='red', s=50, alpha=0.7, label='Heavy Institutional Selling')
         
         axes[0].set_title(f'{stock_name} Price with Institutional Selling Markers', fontsize=16)
@@ -74,7 +151,7 @@ class EnhancedMoneyFlowAnalyzer:
         axes[0].legend()
         
         # 2. Daily wealth transfer
-        axes[1].plot(self.data['date'], self.data[f'{stock_name}_wealth_transfer'], 
+        axes[1].plot(data['date'], data['wealth_transfer'], 
                    color='purple', linewidth=2)
         axes[1].axhline(y=0, color='gray', linestyle='--')
         axes[1].set_title(f'{stock_name} Daily Wealth Transfer (Retail to Institutional)', fontsize=16)
@@ -82,7 +159,7 @@ class EnhancedMoneyFlowAnalyzer:
         axes[1].grid(True)
         
         # 3. Cumulative wealth transfer
-        axes[2].plot(self.data['date'], self.data[f'{stock_name}_cum_wealth_transfer'], 
+        axes[2].plot(data['date'], data['cum_wealth_transfer'], 
                     color='darkred', linewidth=2)
         axes[2].axhline(y=0, color='gray', linestyle='--')
         axes[2].set_title(f'{stock_name} Cumulative Wealth Transfer', fontsize=16)
@@ -95,7 +172,9 @@ class EnhancedMoneyFlowAnalyzer:
     def plot_retail_fate_after_inst_selling(self, stock_name):
         """Plot what happens to retail investments after institutional selling"""
         # Filter to days with heavy institutional selling
-        sell_days = self.data[self.data[f'{stock_name}_heavy_inst_selling'] == 1].copy()
+        data = self.stock_frame(stock_name, ['heavy_inst_selling', 'retail_buying_into_selling']
+                                + [f'price_change_{window}d' for window in FORWARD_WINDOWS])
+        sell_days = data[data['heavy_inst_selling'] == 1]
         
         if sell_days.empty:
             # Create a figure with a message if no selling days
@@ -113,7 +192,7 @@ class EnhancedMoneyFlowAnalyzer:
         
         # Price changes X days after institutional selling
         for i, window in enumerate(window_sizes):
-            avg_change = sell_days[f'{stock_name}_price_change_{window}d'].mean() * 100
+            avg_change = sell_days[f'price_change_{window}d'].mean() * 100
             axes[0].bar(i, avg_change, color=colors[i], 
                       label=f'{window} Days Later: {avg_change:.2f}%')
         
@@ -125,14 +204,13 @@ class EnhancedMoneyFlowAnalyzer:
         axes[0].grid(axis='y')
         
         # 2. Retail money flow and subsequent value
-        retail_flow_during_selling = sell_days[f'{stock_name}_retail_buying_into_selling'].sum()
+        retail_flow_during_selling = sell_days['retail_buying_into_selling'].sum()
         
         # Value of these investments after X days
         value_after = []
         for window in window_sizes:
-            col = f'{stock_name}_retail_value_change_{window}d'
-            value = sell_days[f'{stock_name}_retail_buying_into_selling'].sum() * (
-                1 + sell_days[f'{stock_name}_price_change_{window}d'].mean())
+            value = sell_days['retail_buying_into_selling'].sum() * (
+                1 + sell_days[f'price_change_{window}d'].mean())
             value_after.append(value)
         
         # Calculate gain/loss percentage
@@ -165,30 +243,22 @@ class EnhancedMoneyFlowAnalyzer:
     def create_wealth_transfer_summary(self, stock_name):
         """Create a comprehensive summary of wealth transfer dynamics"""
         # Filter to days with heavy institutional selling
-        sell_days = self.data[self.data[f'{stock_name}_heavy_inst_selling'] == 1]
+        data = self.stock_frame(stock_name, ['heavy_inst_selling', 'wealth_transfer', 'retail_buying_into_selling']
+                                + [f'price_change_{window}d' for window in FORWARD_WINDOWS])
+        sell_days = data[data['heavy_inst_selling'] == 1]
         
         # Summary stats
-        total_wealth_transfer = self.data[f'{stock_name}_wealth_transfer'].sum()
-        retail_investment_during_inst_selling = self.data[f'{stock_name}_retail_buying_into_selling'].sum()
+        total_wealth_transfer = data['wealth_transfer'].sum()
+        retail_investment_during_inst_selling = data['retail_buying_into_selling'].sum()
         
         # Calculate post-selling returns
         returns_after = {}
-        for window in [5, 10, 20]:
-            avg_change = sell_days[f'{stock_name}_price_change_{window}d'].mean() * 100
+        for window in FORWARD_WINDOWS:
+            avg_change = sell_days[f'price_change_{window}d'].mean() * 100
             returns_after[window] = avg_change
         
         # Count distribution phases
-        phases = 0
-        threshold = np.percentile(
-            self.data[self.data[f'{stock_name}_inst_flow'] < 0][f'{stock_name}_inst_flow'], 25)
-        
-        in_phase = False
-        for i in range(1, len(self.data)):
-            if not in_phase and self.data[f'{stock_name}_inst_flow'].iloc[i] <= threshold:
-                in_phase = True
-                phases += 1
-            elif in_phase and self.data[f'{stock_name}_inst_flow'].iloc[i] > threshold:
-                in_phase = False
+        phases = int((self.segments([stock_name])['regime'] == 'distribution').sum())
         
         return {
             'total_wealth_transfer': total_wealth_transfer,
@@ -0,0 +1,231 @@
+import json
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from money_flow_store import MoneyFlowStore, DayRecord
+
+MAGIC = b'MFEVLOG1'
+HEADER_SIZE = 16  # Magic plus record size, padded
+
+# Event kinds and what their `value` / `aux` fields hold
+PRICE = 0            # close price / traded volume
+FLOW = 1             # institutional flow / retail flow
+DEMAND = 2           # institutional demand / retail demand
+INST_DECISION = 3    # demand / capital
+RETAIL_DECISION = 4  # demand / cohort weight
+
+NO_AGENT = np.iinfo(np.uint32).max
+
+# Fixed-width little-endian record, 27 bytes
+EVENT_DTYPE = np.dtype([('day', '<u4'), ('kind', 'u1'), ('stock', '<u2'), ('agent', '<u4'),
+                        ('value', '<f8'), ('aux', '<f8')])
+
+
+def _meta_path(path):
+    return f"{path}.meta.json"
+
+
+class EventLogWriter:
+    """Appends a simulation's price updates and agent decisions to a binary log.
+
+    Every event is one EVENT_DTYPE record; days are written in order, so a
+    reader can binary-search the `day` field. Records are buffered and
+    written in large blocks. Stock and agent names go to a JSON sidecar
+    (`<path>.meta.json`), rewritten on close. Attach with
+    `sim.enable_event_log(path)`.
+
+    Checkpoints record how far the log had been written. Unpickling never
+    touches the filesystem: the restored writer is detached until
+    `resume(path)` copies the checkpointed part of the log into a new file
+    it owns, so the original simulator can keep writing its own log
+    (`fork_simulation` does this for you).
+    """
+
+    def __init__(self, path, stock_names, inst_names, retail_names, start_date=None,
+                 decisions=True, buffer_records=1 << 16, overwrite=False):
+        self.path = path
+        self.decisions = decisions  # Set False to log only per-stock events
+        self.meta = {
+            'stocks': list(stock_names),
+            'institutional': list(inst_names),
+            'retail': list(retail_names),
+            'start_date': (start_date or datetime.now()).isoformat(),
+        }
+        self._buffer = np.empty(buffer_records, dtype=EVENT_DTYPE)
+        self._buffered = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0 and not overwrite:
+            raise FileExistsError(f"{path} already holds an event log; pass overwrite=True to replace it")
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + np.uint32(EVENT_DTYPE.itemsize).tobytes()
+                         + bytes(HEADER_SIZE - len(MAGIC) - 4))
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(_meta_path(self.path), 'w') as f:
+            json.dump(self.meta, f)
+
+    def _append(self, day, kind, stocks, agents, values, aux):
+        count = len(values)
+        if count > len(self._buffer) - self._buffered:
+            self.flush()
+            if count > len(self._buffer):
+                self._buffer = np.empty(count, dtype=EVENT_DTYPE)
+        block = self._buffer[self._buffered:self._buffered + count]
+        block['day'] = day
+        block['kind'] = kind
+        block['stock'] = stocks
+        block['agent'] = agents
+        block['value'] = values
+        block['aux'] = aux
+        self._buffered += count
+
+    def write_day(self, day_number, day, volume=0.0, inst_decisions=None, retail_decisions=None):
+        """Log one day: per-stock price, flow and demand plus optional decisions.
+
+        Decisions are `(agents, stocks, demands, aux)` arrays, where agent
+        indices refer to the sidecar's institutional or retail name list.
+        """
+        if self._file is None:
+            raise RuntimeError("Event log writer is detached; call resume(path) after restoring a checkpoint")
+        stocks = np.arange(len(day.price))
+        self._append(day_number, PRICE, stocks, NO_AGENT, day.price, volume)
+        self._append(day_number, FLOW, stocks, NO_AGENT, day.inst_flow, day.retail_flow)
+        self._append(day_number, DEMAND, stocks, NO_AGENT, day.inst_demand, day.retail_demand)
+        if self.decisions:
+            for kind, decisions in ((INST_DECISION, inst_decisions), (RETAIL_DECISION, retail_decisions)):
+                if decisions is not None and len(decisions[0]):
+                    agents, decision_stocks, demands, aux = decisions
+                    self._append(day_number, kind, decision_stocks, agents, demands, aux)
+
+    def flush(self):
+        if self._buffered:
+            self._file.write(self._buffer[:self._buffered].tobytes())
+            self._buffered = 0
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+            self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def resume(self, path, chunk_bytes=1 << 24):
+        """Attach a restored writer to a new log at `path`.
+
+        The first `_offset` bytes of the checkpointed log (everything
+        written up to the checkpoint) are copied there; later days in the
+        original file belong to another timeline and are left alone.
+        """
+        if self._file is not None:
+            raise RuntimeError("Event log writer is already attached to a file")
+        source = self.path
+        if os.path.abspath(path) == os.path.abspath(source):
+            raise ValueError("A restored simulation needs its own event log path")
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            raise FileExistsError(f"{path} already holds an event log")
+        remaining = self._offset
+        with open(source, 'rb') as src, open(path, 'wb') as dst:
+            while remaining:
+                chunk = src.read(min(chunk_bytes, remaining))
+                if not chunk:
+                    raise ValueError(f"{source} is shorter than when the checkpoint was taken")
+                dst.write(chunk)
+                remaining -= len(chunk)
+        self.path = path
+        self._file = open(path, 'ab')
+        self._write_meta()
+
+    def __getstate__(self):
+        # Checkpoints keep the path and how much of the file was written
+        state = self.__dict__.copy()
+        if self._file is not None:
+            self.flush()
+            state['_offset'] = self._file.tell()
+        state['_file'] = None
+        state['_buffered'] = 0
+        return state
+
+    def __setstate__(self, state):
+        # Restored detached; see resume()
+        self.__dict__.update(state)
+
+
+class EventLog:
+    """Memory-mapped reader for an EventLogWriter log.
+
+    Opening is instant whatever the log size; only the pages for the days
+    and events actually read are loaded.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a simulation event log")
+        record_size = int(np.frombuffer(header[len(MAGIC):len(MAGIC) + 4], dtype='<u4')[0])
+        if record_size != EVENT_DTYPE.itemsize:
+            raise ValueError(f"Unsupported event record size: {record_size}")
+        with open(_meta_path(path)) as f:
+            self.meta = json.load(f)
+        self.stock_names = self.meta['stocks']
+        self.start_date = datetime.fromisoformat(self.meta['start_date'])
+        n_records = (os.path.getsize(path) - HEADER_SIZE) // EVENT_DTYPE.itemsize
+        self.events = np.memmap(path, dtype=EVENT_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def days(self):
+        """Simulated day numbers in the log"""
+        if not len(self.events):
+            return np.arange(0)
+        return np.arange(int(self.events['day'][0]), int(self.events['day'][-1]) + 1)
+
+    def day(self, day_number):
+        """All events of one day, found by binary search on the day field"""
+        day_field = self.events['day']
+        start = np.searchsorted(day_field, day_number, side='left')
+        end = np.searchsorted(day_field, day_number, side='right')
+        return self.events[start:end]
+
+    def decisions(self, day_number, kind=RETAIL_DECISION):
+        """DataFrame of one day's institutional or retail decisions with agent names"""
+        events = self.day(day_number)
+        events = events[events['kind'] == kind]
+        names = self.meta['institutional' if kind == INST_DECISION else 'retail']
+        return pd.DataFrame({
+            'agent': np.array(names, dtype=object)[events['agent']] if len(events) else [],
+            'stock': np.array(self.stock_names, dtype=object)[events['stock']] if len(events) else [],
+            'demand': events['value'],
+            'aux': events['aux'],
+        })
+
+    def iter_days(self, start=None, stop=None):
+        """Replay DayRecords from the per-stock events, without re-simulating"""
+        for day_number in self.days:
+            if (start is not None and day_number < start) or (stop is not None and day_number >= stop):
+                continue
+            events = self.day(day_number)
+            by_kind = {kind: events[events['kind'] == kind] for kind in (PRICE, FLOW, DEMAND)}
+            yield DayRecord(self.start_date + timedelta(days=int(day_number)),
+                            by_kind[PRICE]['value'], by_kind[FLOW]['value'], by_kind[FLOW]['aux'],
+                            by_kind[DEMAND]['value'], by_kind[DEMAND]['aux'])
+
+    def to_store(self, start=None, stop=None):
+        """Re-derive the run's MoneyFlowStore (and hence get_data_frame) from the log"""
+        store = MoneyFlowStore(self.stock_names)
+        for day in self.iter_days(start, stop):
+            store.append(*day)
+        return store
+
+    def to_frame(self, start=None, stop=None):
+        return self.to_store(start, stop).to_frame()
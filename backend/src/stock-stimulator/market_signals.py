@@ -0,0 +1,78 @@
+import numpy as np
+
+# Lookback used by RetailInvestor: price_history[-1] / price_history[-5]
+RETAIL_TREND_LOOKBACK = 4
+
+
+class MarketSnapshot:
+    """Market indicators for one simulated day, shared by every agent.
+
+    Each indicator is a dict keyed by its window length whose values are
+    arrays ordered like `stock_names`. Indicators without enough history
+    yet are NaN.
+    """
+
+    def __init__(self, stock_names, price, trend, moving_average, volatility, rsi):
+        self.stock_names = stock_names
+        self.price = price
+        self.trend = trend
+        self.moving_average = moving_average
+        self.volatility = volatility
+        self.rsi = rsi
+
+    def stock_index(self, stock_name):
+        return self.stock_names.index(stock_name)
+
+
+class MarketSignals:
+    """Computes a MarketSnapshot once per simulated day for all stocks"""
+
+    def __init__(self, trend_lookbacks=(RETAIL_TREND_LOOKBACK,), ma_windows=(5, 20),
+                 volatility_windows=(20,), rsi_periods=(14,)):
+        # Retail investors always need their own trend lookback
+        self.trend_lookbacks = tuple(sorted(set(trend_lookbacks) | {RETAIL_TREND_LOOKBACK}))
+        self.ma_windows = tuple(ma_windows)
+        self.volatility_windows = tuple(volatility_windows)
+        self.rsi_periods = tuple(rsi_periods)
+
+    @property
+    def window(self):
+        """Number of most recent prices needed to compute every indicator"""
+        return max([lookback + 1 for lookback in self.trend_lookbacks] +
+                   [window for window in self.ma_windows] +
+                   [window + 1 for window in self.volatility_windows] +
+                   [period + 1 for period in self.rsi_periods])
+
+    def compute(self, stock_names, prices):
+        """Build a snapshot from a (days, stocks) window, oldest row first"""
+        prices = np.asarray(prices, dtype=float)
+        days, n_stocks = prices.shape
+        missing = np.full(n_stocks, np.nan)
+        latest = prices[-1]
+
+        trend = {}
+        for lookback in self.trend_lookbacks:
+            trend[lookback] = latest / prices[-1 - lookback] - 1 if days > lookback else missing
+
+        moving_average = {}
+        for window in self.ma_windows:
+            moving_average[window] = prices[-window:].mean(axis=0) if days >= window else missing
+
+        returns = prices[1:] / prices[:-1] - 1
+        volatility = {}
+        for window in self.volatility_windows:
+            volatility[window] = returns[-window:].std(axis=0, ddof=1) if len(returns) >= window else missing
+
+        changes = np.diff(prices, axis=0)
+        rsi = {}
+        for period in self.rsi_periods:
+            if len(changes) < period:
+                rsi[period] = missing
+                continue
+            recent = changes[-period:]
+            gains = np.maximum(recent, 0).mean(axis=0)
+            losses = np.maximum(-recent, 0).mean(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi[period] = np.where(losses > 0, 100 - 100 / (1 + gains / losses), 100.0)
+
+        return MarketSnapshot(list(stock_names), latest, trend, moving_average, volatility, rsi)
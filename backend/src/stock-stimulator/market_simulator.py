@@ -1,48 +1,97 @@
+import math
+import time
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
-import random
+from money_flow_store import MoneyFlowStore, DayRecord
+from market_signals import MarketSignals, RETAIL_TREND_LOOKBACK
+from ring_buffer import RingBuffer
+from cohorts import bucket_retail_population
+from profiling import timed_decision
+from portfolio_ledger import PortfolioLedger
+from intraday import IntradaySimulator
+from event_log import EventLogWriter
+from strategies import STRATEGIES, NO_TARGET, PumpAndDumpStrategy
+
+# Recent prices kept per stock; enough for the default market signals
+DEFAULT_HISTORY_CAPACITY = 32
 
 class Stock:
-    def __init__(self, name, initial_price, volatility):
+    # Only the recent window agents look back over is kept here; the full
+    # price path is recorded in the simulator's MoneyFlowStore.
+    __slots__ = ('name', 'price', 'volatility', 'price_history', 'volume',
+                 'institutional_holdings', 'retail_holdings')
+    
+    def __init__(self, name, initial_price, volatility, history_capacity=DEFAULT_HISTORY_CAPACITY):
         self.name = name
         self.price = initial_price
         self.volatility = volatility
-        self.price_history = [initial_price]
-        self.volume_history = [0]
+        self.price_history = RingBuffer(history_capacity)
+        self.price_history.append(initial_price)
+        self.volume = 0
         self.institutional_holdings = 0
         self.retail_holdings = 0
         
-    def update_price(self, institutional_demand, retail_demand):
+    def recent_prices(self, n):
+        """The last `n` prices (fewer early in the run), oldest first"""
+        return self.price_history.last(n)
+        
+    def update_price(self, institutional_demand, retail_demand, rng=np.random, shock=None):
         # Calculate new price based on combined demand and volatility
         demand_factor = (institutional_demand * 2 + retail_demand) / 3  # Institutional has more impact
-        price_change = self.price * (demand_factor * self.volatility + 
-                                    np.random.normal(0, self.volatility/2))
+        if shock is None:
+            shock = rng.normal(0, self.volatility/2)
+        price_change = self.price * (demand_factor * self.volatility + shock)
         self.price += price_change
         self.price = max(0.01, self.price)  # Ensure price stays positive
         self.price_history.append(self.price)
         return self.price
+        
+    def set_price(self, price):
+        """Move to an externally given price, e.g. from a PriceReplay"""
+        self.price = max(0.01, price)
+        self.price_history.append(self.price)
+        return self.price
 
 class InstitutionalInvestor:
-    def __init__(self, name, capital, strategy="pump_and_dump"):
+    def __init__(self, name, capital, strategy="pump_and_dump", aggression=1.0, phase_lengths=None):
         self.name = name
         self.capital = capital
         self.strategy = strategy
+        self.aggression = aggression  # Scales the demand of every decision
+        # Days spent accumulating, pumping and distributing
+        self.phase_lengths = tuple(phase_lengths or PumpAndDumpStrategy.phase_lengths)
         self.holdings = {}
         self.transaction_history = []
         self.phase = "accumulation"  # accumulation, pump, distribution
         self.phase_counter = 0
         self.target_stock = None
+        self.strategy_state = None  # Per-investor arrays for registered strategies
         
     def decide_action(self, market):
         if self.strategy == "pump_and_dump":
-            return self._pump_and_dump_strategy(market)
-        return 0, None
+            action, target = self._pump_and_dump_strategy(market)
+        elif self.strategy in STRATEGIES:
+            action, target = self._registered_strategy(market)
+        else:
+            return 0, None
+        return action * self.aggression, target
+        
+    def _registered_strategy(self, market):
+        # Batched strategy kernels run here with a batch of one
+        kernel = STRATEGIES[self.strategy]
+        if self.strategy_state is None:
+            self.strategy_state = kernel.init_state(1, market.rng)
+        targets, actions = kernel.step(self.strategy_state, market.snapshot, market.rng, len(market.stocks))
+        if targets[0] == NO_TARGET:
+            return 0, None
+        return float(actions[0]), market.snapshot.stock_names[targets[0]]
         
     def _pump_and_dump_strategy(self, market):
-        if not self.target_stock and random.random() < 0.1:
+        rng = market.rng
+        if not self.target_stock and rng.random() < 0.1:
             # Select a new target occasionally
-            self.target_stock = random.choice(list(market.stocks.keys()))
+            stock_names = list(market.stocks.keys())
+            self.target_stock = stock_names[rng.integers(len(stock_names))]
             self.phase = "accumulation"
             self.phase_counter = 0
             
@@ -54,49 +103,51 @@ class InstitutionalInvestor:
         
         if self.phase == "accumulation":
             # Quietly accumulate shares
-            action = 0.3 + random.random() * 0.2
+            action = 0.3 + rng.random() * 0.2
             self.phase_counter += 1
-            if self.phase_counter > 20:  # After sufficient accumulation
+            if self.phase_counter > self.phase_lengths[0]:  # After sufficient accumulation
                 self.phase = "pump"
                 self.phase_counter = 0
                 
         elif self.phase == "pump":
             # Aggressively push prices up
-            action = 0.7 + random.random() * 0.3
+            action = 0.7 + rng.random() * 0.3
             self.phase_counter += 1
-            if self.phase_counter > 10:  # After sufficient pumping
+            if self.phase_counter > self.phase_lengths[1]:  # After sufficient pumping
                 self.phase = "distribution"
                 self.phase_counter = 0
                 
         elif self.phase == "distribution":
             # Sell holdings to retail investors
-            action = -0.8 - random.random() * 0.2
+            action = -0.8 - rng.random() * 0.2
             self.phase_counter += 1
-            if self.phase_counter > 15:  # After distribution
+            if self.phase_counter > self.phase_lengths[2]:  # After distribution
                 self.target_stock = None
         
         return action, self.target_stock
 
 class RetailInvestor:
-    def __init__(self, name, capital, fomo_factor=0.5):
+    def __init__(self, name, capital, fomo_factor=0.5, weight=1, panic_factor=0.7):
         self.name = name
         self.capital = capital
+        self.weight = weight  # Number of investors this agent stands for (cohort mode)
         self.fomo_factor = fomo_factor  # How easily influenced by rising prices
-        self.panic_factor = 0.7  # How easily scared by falling prices
+        self.base_fomo_factor = fomo_factor  # FOMO before any social influence
+        self.panic_factor = panic_factor  # How easily scared by falling prices
         self.holdings = {}
         self.transaction_history = []
         
     def decide_action(self, market):
         # Simple strategy: buy on rising prices (FOMO), sell on falling prices
+        # Trends come from the market's shared per-day snapshot
         actions = {}
-        for stock_name, stock in market.stocks.items():
-            if len(stock.price_history) < 5:
+        snapshot = market.snapshot
+        trends = snapshot.trend[RETAIL_TREND_LOOKBACK].tolist()
+        for stock_name, recent_trend in zip(snapshot.stock_names, trends):
+            if math.isnan(recent_trend):  # Not enough price history yet
                 actions[stock_name] = 0
                 continue
                 
-            # Calculate recent price trend
-            recent_trend = (stock.price_history[-1] / stock.price_history[-5]) - 1
-            
             if recent_trend > 0.05:  # Price rising
                 # FOMO buying - stronger as trend grows
                 actions[stock_name] = min(recent_trend * self.fomo_factor, 1.0)
@@ -113,76 +164,306 @@ class RetailInvestor:
         return 0, None
 
 class MarketSimulator:
-    def __init__(self):
+    def __init__(self, seed=None, signals=None, order_book=None):
+        # All randomness flows through one Generator so runs are reproducible
+        self.rng = np.random.default_rng(seed)
+        self.signals = signals or MarketSignals()
+        # Optional OrderBookPriceModel; prices then come from matched orders
+        self.order_book = order_book
+        self.profiler = None  # Optional SimulationProfiler
+        self.replay = None  # Optional PriceReplay supplying prices or shocks
+        self.shock_model = None  # Optional FactorShockModel for correlated noise
+        self.social_network = None  # Optional SocialNetwork over retail investors
+        self.ledger = None  # Optional PortfolioLedger, see enable_ledger
+        self.intraday = None  # Optional IntradaySimulator, see enable_intraday
+        self.event_log = None  # Optional EventLogWriter, see enable_event_log
+        self.snapshot = None  # MarketSnapshot for the day being simulated
         self.stocks = {}
         self.institutional_investors = []
         self.retail_investors = []
+        self.retail_population = 0  # Sum of retail investor weights
         self.current_day = 0
-        self.dates = []
-        self.money_flow_data = []
+        self.start_date = datetime.now()
+        self.money_flow = None  # MoneyFlowStore, created on the first simulated day
         
     def add_stock(self, name, price, volatility):
-        self.stocks[name] = Stock(name, price, volatility)
+        capacity = max(DEFAULT_HISTORY_CAPACITY, self.signals.window)
+        self.stocks[name] = Stock(name, price, volatility, capacity)
         
-    def add_institutional_investor(self, name, capital, strategy="pump_and_dump"):
-        self.institutional_investors.append(InstitutionalInvestor(name, capital, strategy))
+    def add_institutional_investor(self, name, capital, strategy="pump_and_dump", aggression=1.0,
+                                   phase_lengths=None):
+        self.institutional_investors.append(
+            InstitutionalInvestor(name, capital, strategy, aggression, phase_lengths))
         
-    def add_retail_investor(self, name, capital, fomo_factor=0.5):
-        self.retail_investors.append(RetailInvestor(name, capital, fomo_factor))
+    def add_retail_investor(self, name, capital, fomo_factor=0.5, weight=1, panic_factor=0.7):
+        self.retail_investors.append(RetailInvestor(name, capital, fomo_factor, weight, panic_factor))
+        self.retail_population += weight
+        
+    def enable_ledger(self, participation=0.01):
+        """Track per-investor positions and P&L in a PortfolioLedger.
+
+        Call after adding all investors. Without an order book each decision
+        fills at the day's close for `abs(demand) * capital * participation`
+        dollars (times the cohort weight for retail), the same sizing the
+        order book model uses.
+        """
+        investors = self.institutional_investors + self.retail_investors
+        self.ledger = PortfolioLedger([investor.name for investor in investors], list(self.stocks),
+                                      [investor.capital for investor in investors])
+        self.ledger_participation = participation
+        return self.ledger
+
+    def enable_event_log(self, path, decisions=True, overwrite=False):
+        """Append every day's prices, flows and agent decisions to a binary log (see event_log.py).
+
+        Call after adding all stocks and investors.
+        """
+        self.event_log = EventLogWriter(path, list(self.stocks),
+                                        [investor.name for investor in self.institutional_investors],
+                                        [investor.name for investor in self.retail_investors],
+                                        self.start_date, decisions, overwrite=overwrite)
+        return self.event_log
+
+    def _log_day(self, day, inst_decisions, retail_decisions):
+        stock_index = {name: i for i, name in enumerate(self.stocks)}
+        # Rebuilt daily: identities do not survive checkpoint round trips
+        agents = {id(investor): i for investors in (self.institutional_investors, self.retail_investors)
+                  for i, investor in enumerate(investors)}
+        logged = []
+        for decisions, aux in ((inst_decisions, 'capital'), (retail_decisions, 'weight')):
+            rows = [(agents[id(investor)], stock_index[stock_name], demand, getattr(investor, aux))
+                    for investor, stock_name, demand in decisions]
+            columns = list(zip(*rows)) if rows else ([], [], [], [])
+            logged.append(tuple(np.asarray(column) for column in columns))
+        volume = [stock.volume for stock in self.stocks.values()]
+        self.event_log.write_day(self.current_day, day, volume, *logged)
+
+    def _record_fills(self, decisions):
+        stock_index = {name: i for i, name in enumerate(self.stocks)}
+        rows = {id(investor): row for row, investor in
+                enumerate(self.institutional_investors + self.retail_investors)}
+        investors, stocks, quantities, prices = [], [], [], []
+        if self.order_book is not None:
+            # Use the actual fills; the market maker (owner None) is not tracked
+            for stock_name, book in self.order_book.books.items():
+                for buyer, seller, price, quantity in book.fills:
+                    for owner, sign in ((buyer, 1), (seller, -1)):
+                        if owner is not None:
+                            investors.append(rows[id(owner)])
+                            stocks.append(stock_index[stock_name])
+                            quantities.append(sign * quantity)
+                            prices.append(price)
+        else:
+            for investor, stock_name, demand in decisions:
+                if stock_name and demand:
+                    price = self.stocks[stock_name].price
+                    investors.append(rows[id(investor)])
+                    stocks.append(stock_index[stock_name])
+                    quantities.append(demand * investor.capital * self.ledger_participation
+                                      * getattr(investor, 'weight', 1) / price)
+                    prices.append(price)
+        self.ledger.apply_fills(investors, stocks, quantities, prices)
+
+    def enable_intraday(self, steps_per_day=390, step_seconds=60, seed=None, retail_feedback=0.5):
+        """Step every simulated day's session at sub-day resolution (see IntradaySimulator).
+
+        Call after adding all stocks. Daily closes and flows then come from
+        the intraday steps. Without a seed the session generator is spawned
+        from the simulator's seed, so runs stay reproducible.
+        """
+        if seed is None:
+            seed = self.rng.bit_generator.seed_seq.spawn(1)[0]
+        self.intraday = IntradaySimulator(list(self.stocks), steps_per_day, step_seconds, seed=seed,
+                                          retail_feedback=retail_feedback)
+        return self.intraday
+
+    def add_retail_cohorts(self, fomo_factors, capital=100000, n_cohorts=256):
+        """Add a large retail population as weighted FOMO cohorts (see cohorts.py)"""
+        cohorts = bucket_retail_population(fomo_factors, n_cohorts, capital)
+        start = len(self.retail_investors)
+        for i in range(len(cohorts)):
+            self.add_retail_investor(f"Cohort_{start + i}", cohorts.capital[i],
+                                     cohorts.fomo[i], int(cohorts.size[i]))
+        return cohorts
         
     def simulate_day(self):
+        return self._step(record=True)
+        
+    def iter_days(self, days=None, record=True):
+        """Yield each day's DayRecord as soon as it is simulated.
+        
+        Runs forever when `days` is None. With record=False the days are not
+        kept in the output store, so memory stays bounded however long the
+        run is.
+        """
+        if record and days is not None:
+            self._output_store().reserve(days)
+        simulated = 0
+        while days is None or simulated < days:
+            day = self._step(record)
+            simulated += 1
+            yield day
+        
+    def _step(self, record):
+        """Advance the market by one day and return that day's record"""
+        profiler = self.profiler
+        if profiler is not None:
+            phase_start = time.perf_counter()
+        
         self.current_day += 1
-        self.dates.append(datetime.now() + timedelta(days=self.current_day))
+        date = self.start_date + timedelta(days=self.current_day)
+        
+        # Indicators are computed once per day and read by every agent
+        self.snapshot = self.compute_snapshot()
+        if profiler is not None:
+            phase_start = self._end_phase('signals', phase_start)
         
         # Process institutional investors first
         institutional_demands = {stock: 0 for stock in self.stocks}
+        inst_decisions = []
         for investor in self.institutional_investors:
-            demand, stock_name = investor.decide_action(self)
+            if profiler is not None:
+                demand, stock_name = timed_decision(profiler, 'institutional', investor.decide_action, self)
+            else:
+                demand, stock_name = investor.decide_action(self)
             if stock_name:
                 institutional_demands[stock_name] += demand
+                inst_decisions.append((investor, stock_name, demand))
+        if profiler is not None:
+            phase_start = self._end_phase('institutional', phase_start)
         
         # Then process retail investors
         retail_demands = {stock: 0 for stock in self.stocks}
+        retail_decisions = []
+        network = self.social_network
+        if network is not None:
+            # Neighbour sentiment scales each investor's base FOMO for today
+            base_fomo = [investor.base_fomo_factor for investor in self.retail_investors]
+            for investor, fomo in zip(self.retail_investors, network.fomo(np.array(base_fomo)).tolist()):
+                investor.fomo_factor = fomo
+            day_actions = []
         for investor in self.retail_investors:
-            demand, stock_name = investor.decide_action(self)
+            if profiler is not None:
+                demand, stock_name = timed_decision(profiler, 'retail', investor.decide_action, self)
+            else:
+                demand, stock_name = investor.decide_action(self)
             if stock_name:
-                retail_demands[stock_name] += demand
+                retail_demands[stock_name] += demand * investor.weight
+                retail_decisions.append((investor, stock_name, demand))
+            if network is not None:
+                day_actions.append(demand if stock_name else 0.0)
+        if network is not None:
+            network.observe(np.array(day_actions))
+        if profiler is not None:
+            phase_start = self._end_phase('retail', phase_start)
         
-        # Update prices and record money flow
-        day_data = {'date': self.dates[-1]}
-        for stock_name, stock in self.stocks.items():
-            inst_demand = institutional_demands[stock_name] / len(self.institutional_investors) if self.institutional_investors else 0
-            retail_demand = retail_demands[stock_name] / len(self.retail_investors) if self.retail_investors else 0
-            
-            new_price = stock.update_price(inst_demand, retail_demand)
-            
-            # Track money flow
-            inst_flow = inst_demand * stock.price * 100000  # Approximate dollar value
-            retail_flow = retail_demand * stock.price * 10000
+        # Update prices
+        inst_demands, retail_demand_list = [], []
+        for stock_name in self.stocks:
+            inst_demands.append(institutional_demands[stock_name] / len(self.institutional_investors) if self.institutional_investors else 0)
+            retail_demand_list.append(retail_demands[stock_name] / self.retail_population if self.retail_investors else 0)
+        
+        intraday = self.intraday
+        if intraday is not None and (self.order_book is not None
+                                     or (self.replay is not None and self.replay.mode == 'prices')):
+            raise ValueError("Intraday mode needs the simulator's own price dynamics, "
+                             "not an order book or replayed prices")
+        if self.order_book is not None:
+            # Prices, volume and holdings come from actual fills
+            inst_notional, retail_notional = self.order_book.run_day(self, inst_decisions, retail_decisions)
+        elif self.replay is not None and self.replay.mode == 'prices':
+            for stock, price in zip(self.stocks.values(), self.replay.row(self.current_day, list(self.stocks))):
+                stock.set_price(price)
+        else:
+            if self.replay is not None:
+                shocks = self.replay.row(self.current_day, list(self.stocks))
+            elif self.shock_model is not None:
+                # Correlated standardized shocks scaled to each stock's noise level
+                shocks = self.shock_model.next(self.rng, list(self.stocks)) * [stock.volatility / 2 for stock in self.stocks.values()]
+            else:
+                shocks = [None] * len(self.stocks)
+            if intraday is not None:
+                volatility = np.array([stock.volatility for stock in self.stocks.values()])
+                noise = self.rng.normal(0, volatility / 2) if shocks[0] is None else np.asarray(shocks, dtype=float)
+                weights = [investor.weight for investor in self.retail_investors]
+                fomo = (np.average([investor.fomo_factor for investor in self.retail_investors], weights=weights)
+                        if self.retail_investors else 0.0)
+                session = intraday.simulate_day(date, [stock.price for stock in self.stocks.values()], volatility,
+                                                inst_demands, retail_demand_list, noise, fomo)
+                closes, intraday_inst_flow, intraday_retail_flow, inst_demands, retail_demand_list = session
+                for stock, price in zip(self.stocks.values(), closes):
+                    stock.set_price(price)
+            else:
+                for stock, inst_demand, retail_demand, shock in zip(self.stocks.values(), inst_demands,
+                                                                    retail_demand_list, shocks):
+                    stock.update_price(inst_demand, retail_demand, self.rng, shock)
+        if profiler is not None:
+            phase_start = self._end_phase('price_update', phase_start)
+        
+        # Record money flow
+        day_prices, day_inst_flow, day_retail_flow = [], [], []
+        for j, (stock_name, stock, inst_demand, retail_demand) in enumerate(zip(
+                self.stocks.keys(), self.stocks.values(), inst_demands, retail_demand_list)):
+            if self.order_book is not None:
+                inst_flow = inst_notional[stock_name]
+                retail_flow = retail_notional[stock_name]
+            elif intraday is not None:
+                inst_flow = intraday_inst_flow[j]
+                retail_flow = intraday_retail_flow[j]
+            else:
+                inst_flow = inst_demand * stock.price * 100000  # Approximate dollar value
+                retail_flow = retail_demand * stock.price * 10000
             
-            day_data[f'{stock_name}_price'] = new_price
-            day_data[f'{stock_name}_inst_flow'] = inst_flow
-            day_data[f'{stock_name}_retail_flow'] = retail_flow
-            day_data[f'{stock_name}_inst_demand'] = inst_demand
-            day_data[f'{stock_name}_retail_demand'] = retail_demand
+            day_prices.append(stock.price)
+            day_inst_flow.append(inst_flow)
+            day_retail_flow.append(retail_flow)
             
             # Update holdings
             stock.institutional_holdings += inst_flow
             stock.retail_holdings += retail_flow
             
-        self.money_flow_data.append(day_data)
+        day = DayRecord(date, np.array(day_prices), np.array(day_inst_flow), np.array(day_retail_flow),
+                        np.array(inst_demands, dtype=float), np.array(retail_demand_list, dtype=float))
+        if self.ledger is not None:
+            self._record_fills(inst_decisions + retail_decisions)
+            self.ledger.mark(day.price)
+        if self.event_log is not None:
+            self._log_day(day, inst_decisions, retail_decisions)
+        if record:
+            self._output_store().append(*day)
+        if profiler is not None:
+            self._end_phase('bookkeeping', phase_start)
+        return day
+        
+    def _end_phase(self, phase, phase_start):
+        now = time.perf_counter()
+        self.profiler.record(phase, now - phase_start, self.current_day)
+        return now
+        
+    def compute_snapshot(self):
+        window = self.signals.window
+        prices = np.column_stack([stock.recent_prices(window) for stock in self.stocks.values()])
+        return self.signals.compute(list(self.stocks.keys()), prices)
+        
+    def _output_store(self):
+        if self.money_flow is None:
+            self.money_flow = MoneyFlowStore(self.stocks.keys())
+        return self.money_flow
         
     def get_data_frame(self):
-        return pd.DataFrame(self.money_flow_data)
+        return self._output_store().to_frame()
     
     def run_simulation(self, days):
+        self._output_store().reserve(days)
+        if self.intraday is not None:
+            self.intraday.reserve(days)
         for _ in range(days):
             self.simulate_day()
         return self.get_data_frame()
 
 # Example usage
-def create_sample_simulation():
-    sim = MarketSimulator()
+def create_sample_simulation(seed=None):
+    sim = MarketSimulator(seed)
     
     # Add stocks
     sim.add_stock("TECH", 100.0, 0.02)
@@ -195,7 +476,7 @@ def create_sample_simulation():
     
     # Add retail investors with varying FOMO factors
     for i in range(50):
-        fomo = 0.3 + random.random() * 0.7  # Between 0.3 and 1.0
+        fomo = 0.3 + sim.rng.random() * 0.7  # Between 0.3 and 1.0
         sim.add_retail_investor(f"Retail_{i}", 100000, fomo)
     
     return sim
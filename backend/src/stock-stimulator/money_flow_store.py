@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+# Per-stock metrics recorded every simulated day, in output column order
+METRICS = ('price', 'inst_flow', 'retail_flow', 'inst_demand', 'retail_demand')
+
+# One simulated day: a date plus one (stocks,) array per metric
+DayRecord = namedtuple('DayRecord', ('date',) + METRICS)
+
+
+class MoneyFlowStore:
+    """Preallocated columnar buffer for the simulator's daily output.
+
+    Values live in a single float64 block of shape (days, stocks, metrics).
+    Because the block is C-contiguous it can be viewed as a 2-D
+    (days, stocks * metrics) matrix whose column order matches the historical
+    `{stock}_{metric}` layout, so pandas can wrap it without copying.
+    """
+
+    def __init__(self, stock_names, capacity=0):
+        self.stock_names = list(stock_names)
+        self.length = 0
+        self._values = np.empty((capacity, len(self.stock_names), len(METRICS)))
+        self._dates = np.empty(capacity, dtype='datetime64[us]')
+
+    @property
+    def capacity(self):
+        return len(self._dates)
+
+    def reserve(self, extra_days):
+        """Make room for at least `extra_days` more rows without regrowing"""
+        needed = self.length + extra_days
+        if needed > self.capacity:
+            # An empty store is sized exactly; extensions still grow geometrically
+            self._resize(max(needed, self.capacity * 2))
+
+    def _resize(self, capacity):
+        values = np.empty((capacity, len(self.stock_names), len(METRICS)))
+        values[:self.length] = self._values[:self.length]
+        dates = np.empty(capacity, dtype='datetime64[us]')
+        dates[:self.length] = self._dates[:self.length]
+        self._values = values
+        self._dates = dates
+
+    def append(self, date, price, inst_flow, retail_flow, inst_demand, retail_demand):
+        """Record one day; each metric is a sequence ordered like stock_names"""
+        if self.length == self.capacity:
+            # Geometric growth keeps open-ended runs amortized O(1) per day
+            self._resize(max(16, self.capacity * 2))
+        row = self._values[self.length]
+        row[:, 0] = price
+        row[:, 1] = inst_flow
+        row[:, 2] = retail_flow
+        row[:, 3] = inst_demand
+        row[:, 4] = retail_demand
+        self._dates[self.length] = np.datetime64(date, 'us')
+        self.length += 1
+
+    @property
+    def values(self):
+        """View of the recorded rows as a (days, stocks, metrics) array"""
+        return self._values[:self.length]
+
+    @property
+    def dates(self):
+        return self._dates[:self.length]
+
+    def metric(self, name):
+        """(days, stocks) view of a single metric"""
+        return self.values[:, :, METRICS.index(name)]
+
+    def column(self, stock_name, metric):
+        return self.values[:, self.stock_names.index(stock_name), METRICS.index(metric)]
+
+    def columns(self):
+        return [f'{stock}_{metric}' for stock in self.stock_names for metric in METRICS]
+
+    def to_frame(self, copy=True):
+        """Recorded rows as a DataFrame in the `{stock}_{metric}` column layout.
+
+        With copy=False the frame wraps the float block without copying it.
+        That view is read-only, so edits cannot rewrite the recorded history;
+        use it for frames that are only read, such as sink output.
+        """
+        block = self.values.reshape(self.length, -1)
+        if copy:
+            block = block.copy()
+        else:
+            block.flags.writeable = False
+        frame = pd.DataFrame(block, columns=self.columns(), copy=False)
+        frame.insert(0, 'date', pd.to_datetime(self.dates))
+        return frame
+
+    def __getstate__(self):
+        # Checkpoints only carry the recorded rows, not the spare capacity
+        state = self.__dict__.copy()
+        state['_values'] = self.values.copy()
+        state['_dates'] = self.dates.copy()
+        return state
@@ -3,6 +3,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from market_simulator import MarketSimulator, create_sample_simulation
+from checkpoint import checkpoint_simulation, restore_simulation
 from enhanced_money_flow import EnhancedMoneyFlowAnalyzer
 
 def main():
@@ -32,6 +33,12 @@ def main():
         retail_fomo = st.slider("Retail FOMO Factor", 0.1, 2.0, 0.7)
         
         simulate_button = st.button("Run Simulation")
+        
+        # Continue the last run from its checkpoint instead of starting over
+        st.subheader("Extend Last Run")
+        extend_days = st.slider("Additional Days", 10, 365, 30)
+        extend_button = st.button("Extend Simulation",
+                                  disabled=st.session_state.get('sim_checkpoint') is None)
     
     # Main panel - initially show explanation
     if 'simulation_run' not in st.session_state:
@@ -103,7 +110,7 @@ def main():
             for i in range(num_inst):
                 capital = 5000000 + np.random.random() * 15000000  # $5M-$20M
                 strategy = "pump_and_dump"  # Use more aggressive strategy
-                sim.add_institutional_investor(f"Inst_{i}", capital, strategy)
+                sim.add_institutional_investor(f"Inst_{i}", capital, strategy, inst_aggression)
             
             # Add retail investors with FOMO factors
             for i in range(num_retail):
@@ -118,13 +125,26 @@ def main():
             st.session_state.simulation_run = True
             st.session_state.sim_data = data
             st.session_state.stock_names = list(sim.stocks.keys())
+            st.session_state.sim_checkpoint = checkpoint_simulation(sim)
+    
+    # Extend the previous run when requested
+    if extend_button and st.session_state.get('sim_checkpoint') is not None:
+        with st.spinner("Extending simulation..."):
+            sim = restore_simulation(st.session_state.sim_checkpoint)
+            data = sim.run_simulation(extend_days)
+            
+            st.session_state.sim_data = data
+            st.session_state.sim_checkpoint = checkpoint_simulation(sim)
     
     # Display simulation results if available
     if st.session_state.simulation_run and st.session_state.sim_data is not None:
         stock_tabs = st.tabs(st.session_state.stock_names)
         
-        # Create enhanced analyzer
-        analyzer = EnhancedMoneyFlowAnalyzer(st.session_state.sim_data)
+        # Reuse the analyzer (and its memoized metrics) until the data changes
+        analyzer = st.session_state.get('analyzer')
+        if analyzer is None or analyzer.data is not st.session_state.sim_data:
+            analyzer = EnhancedMoneyFlowAnalyzer(st.session_state.sim_data)
+            st.session_state.analyzer = analyzer
         
         for i, stock_name in enumerate(st.session_state.stock_names):
             with stock_tabs[i]:
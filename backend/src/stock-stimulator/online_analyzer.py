@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+from ring_buffer import RingBuffer
+from sinks import Sink
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile for many series at once (the P² algorithm).
+
+    Each series keeps five markers: the minimum, the maximum, the target
+    quantile and two quantiles halfway to the extremes. Every observation
+    shifts the marker positions and nudges the heights with a parabolic
+    (or, failing that, linear) correction, so an update is O(1) per series
+    and memory does not grow with the stream. Until a series has five
+    observations its quantile is computed exactly.
+    """
+
+    def __init__(self, p, n_series):
+        self.p = p
+        self.count = np.zeros(n_series, dtype=np.int64)
+        self._heights = np.zeros((n_series, 5))
+        self._positions = np.tile(np.arange(5, dtype=float), (n_series, 1))
+        self._desired = np.tile(np.array([0, 2 * p, 4 * p, 2 + 2 * p, 4]), (n_series, 1))
+        self._increments = np.array([0, p / 2, p, (1 + p) / 2, 1])
+
+    def update(self, values, mask=None):
+        """Add one observation to every series selected by `mask` (all by default)"""
+        values = np.asarray(values, dtype=float)
+        active = np.ones(len(values), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        filling = np.nonzero(active & (self.count < 5))[0]
+        live = np.nonzero(active & (self.count >= 5))[0]
+        if len(filling):
+            self._heights[filling, self.count[filling]] = values[filling]
+            self.count[filling] += 1
+            ready = filling[self.count[filling] == 5]
+            self._heights[ready] = np.sort(self._heights[ready], axis=1)
+        if len(live):
+            self._step(live, values[live])
+            self.count[live] += 1
+
+    def _step(self, rows, x):
+        q = self._heights[rows]
+        n = self._positions[rows]
+        desired = self._desired[rows] + self._increments
+
+        # Cell of the new observation; the extreme markers absorb new extremes
+        k = (x[:, None] >= q[:, 1:4]).sum(axis=1)
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+        n += np.arange(5) > k[:, None]
+
+        for i in (1, 2, 3):
+            d = desired[:, i] - n[:, i]
+            up = (d >= 1) & (n[:, i + 1] - n[:, i] > 1)
+            down = (d <= -1) & (n[:, i - 1] - n[:, i] < -1)
+            move = up | down
+            if not move.any():
+                continue
+            s = np.where(up, 1.0, -1.0)
+            parabolic = q[:, i] + s / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + s) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - s) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1]))
+            neighbour = np.where(up, i + 1, i - 1)
+            row = np.arange(len(rows))
+            linear = q[:, i] + s * (q[row, neighbour] - q[:, i]) / (n[row, neighbour] - n[:, i])
+            inside = (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1])
+            q[:, i] = np.where(move, np.where(inside, parabolic, linear), q[:, i])
+            n[:, i] += np.where(move, s, 0.0)
+
+        self._heights[rows] = q
+        self._positions[rows] = n
+        self._desired[rows] = desired
+
+    def value(self, empty=np.nan):
+        """Current quantile estimate per series; `empty` where nothing was observed"""
+        estimate = np.where(self.count >= 5, self._heights[:, 2], empty)
+        for row in np.nonzero((self.count > 0) & (self.count < 5))[0]:
+            estimate[row] = np.percentile(self._heights[row, :self.count[row]], self.p * 100)
+        return estimate
+
+
+class OnlineMoneyFlowAnalyzer(Sink):
+    """EnhancedMoneyFlowAnalyzer's wealth-transfer summary, updated one day at a time.
+
+    Feed it days with `update(*day_record)`, or pass it as a sink to
+    `stream_simulation`. Cumulative wealth transfer is a running sum, the
+    heavy-selling and distribution thresholds come from P² quantile
+    sketches of each stock's negative institutional flows, and forward
+    returns after heavy-selling days are credited as their windows mature,
+    using a ring buffer of the last `max(windows)` days. Each day costs
+    O(1) per stock, whatever the length of the run.
+
+    A day's heavy-selling and distribution flags use the thresholds as
+    estimated up to and including that day, where the batch analyzer uses
+    thresholds over the whole run, so early days can be classified
+    differently. Summaries converge on the batch ones as the run grows.
+    """
+
+    def __init__(self, stock_names, heavy_percentile=10, distribution_percentile=25, windows=(5, 10, 20)):
+        self.stock_names = list(stock_names)
+        self.windows = tuple(windows)
+        n_stocks = len(self.stock_names)
+        self.days = 0
+        self.last_date = None
+        self.heavy_quantile = P2Quantile(heavy_percentile / 100, n_stocks)
+        self.distribution_quantile = P2Quantile(distribution_percentile / 100, n_stocks)
+
+        self.cum_wealth_transfer = np.zeros(n_stocks)
+        self.retail_caught_buying = np.zeros(n_stocks)
+        self.heavy_days = np.zeros(n_stocks, dtype=np.int64)
+        self.distribution_phases = np.zeros(n_stocks, dtype=np.int64)
+        self._in_distribution = np.zeros(n_stocks, dtype=bool)
+        # Price change sums and counts over matured windows after heavy-selling days
+        self._change_sum = np.zeros((len(self.windows), n_stocks))
+        self._change_count = np.zeros((len(self.windows), n_stocks), dtype=np.int64)
+        self._retail_value_change = np.zeros((len(self.windows), n_stocks))
+        # Recent (price, heavy flag, retail buying into selling) per stock
+        self._recent = RingBuffer(max(self.windows) + 1, (3, n_stocks))
+
+    def update(self, date, price, inst_flow, retail_flow, *demands):
+        """Fold in one day; arrays are ordered like stock_names (extra DayRecord fields are ignored)"""
+        price = np.asarray(price, dtype=float)
+        inst_flow = np.asarray(inst_flow, dtype=float)
+        retail_flow = np.asarray(retail_flow, dtype=float)
+
+        selling = inst_flow < 0
+        self.cum_wealth_transfer += np.where(selling & (retail_flow > 0), -inst_flow, 0.0)
+        self.heavy_quantile.update(inst_flow, selling)
+        self.distribution_quantile.update(inst_flow, selling)
+
+        heavy = inst_flow <= self.heavy_quantile.value(empty=-np.inf)
+        retail_buying = np.where(heavy, retail_flow, 0.0)
+        self.retail_caught_buying += retail_buying
+        self.heavy_days += heavy
+
+        # Distribution phases are runs below the threshold; the first day is not counted
+        below = inst_flow <= self.distribution_quantile.value(empty=-np.inf)
+        if self.days == 0:
+            below[:] = False
+        self.distribution_phases += below & ~self._in_distribution
+        self._in_distribution = below
+
+        # Credit each window that matures today to the day it started on
+        self._recent.append((price, heavy, retail_buying))
+        recent = self._recent.last()
+        for w, window in enumerate(self.windows):
+            if len(recent) > window:
+                start_price, start_heavy, start_buying = recent[-window - 1]
+                change = price / start_price - 1
+                started_heavy = start_heavy > 0
+                self._change_sum[w] += np.where(started_heavy, change, 0.0)
+                self._change_count[w] += started_heavy
+                self._retail_value_change[w] += start_buying * change
+
+        self.days += 1
+        self.last_date = date
+
+    def write(self, chunk):
+        for date, row in zip(chunk.dates, chunk.values):
+            self.update(date, *row.T)
+
+    def thresholds(self):
+        """Current heavy-selling and distribution thresholds per stock"""
+        return self.heavy_quantile.value(empty=-np.inf), self.distribution_quantile.value(empty=-np.inf)
+
+    def returns_after(self, window):
+        """Mean price change (%) `window` days after heavy-selling days, per stock"""
+        w = self.windows.index(window)
+        count = self._change_count[w]
+        return np.divide(self._change_sum[w], count, out=np.full(len(count), np.nan), where=count > 0) * 100
+
+    def create_wealth_transfer_summary(self, stock_name):
+        """Same keys as EnhancedMoneyFlowAnalyzer.create_wealth_transfer_summary"""
+        j = self.stock_names.index(stock_name)
+        total = self.cum_wealth_transfer[j]
+        phases = int(self.distribution_phases[j])
+        summary = {
+            'total_wealth_transfer': total,
+            'retail_caught_buying': self.retail_caught_buying[j],
+            'number_of_distribution_phases': phases,
+        }
+        for window in self.windows:
+            summary[f'returns_after_{window}d'] = self.returns_after(window)[j]
+        summary['avg_wealth_transfer_per_phase'] = total / max(1, phases)
+        return summary
+
+    def to_frame(self):
+        """One summary row per stock"""
+        return pd.DataFrame([self.create_wealth_transfer_summary(stock_name) for stock_name in self.stock_names],
+                            index=pd.Index(self.stock_names, name='stock'))
@@ -0,0 +1,267 @@
+import heapq
+import time
+from collections import deque
+import numpy as np
+
+BUY = 1
+SELL = -1
+
+
+class Order:
+    __slots__ = ('side', 'ticks', 'remaining', 'owner', 'cancelled', 'generation')
+
+    def __init__(self):
+        self.side = BUY
+        self.ticks = 0
+        self.remaining = 0
+        self.owner = None
+        self.cancelled = False
+        self.generation = 0  # Bumped on release, so ids handed out for a previous use go stale
+
+
+class OrderPool:
+    """Free list of Order objects so the matching loop does not allocate"""
+
+    def __init__(self):
+        self._free = []
+
+    def acquire(self, side, ticks, quantity, owner):
+        order = self._free.pop() if self._free else Order()
+        order.side = side
+        order.ticks = ticks
+        order.remaining = quantity
+        order.owner = owner
+        order.cancelled = False
+        return order
+
+    def release(self, order):
+        order.owner = None
+        order.generation += 1
+        self._free.append(order)
+
+
+class OrderBook:
+    """Price-time priority limit order book for a single stock.
+
+    Each side keeps a heap of price levels (integer ticks) and a FIFO queue
+    of resting orders per level. Fills are appended to `fills` as
+    (buyer, seller, price, quantity) tuples.
+    """
+
+    def __init__(self, tick_size=0.01, pool=None):
+        self.tick_size = tick_size
+        self.pool = pool or OrderPool()
+        self._bid_heap = []  # Negated ticks so the best bid is on top
+        self._ask_heap = []
+        self._bids = {}  # ticks -> deque of resting orders
+        self._asks = {}
+        self.fills = []
+        self.last_price = None
+        self.volume = 0
+
+    def to_ticks(self, price):
+        return int(round(price / self.tick_size))
+
+    def best_bid(self):
+        self._prune(self._bid_heap, self._bids, -1)
+        return -self._bid_heap[0] * self.tick_size if self._bid_heap else None
+
+    def best_ask(self):
+        self._prune(self._ask_heap, self._asks, 1)
+        return self._ask_heap[0] * self.tick_size if self._ask_heap else None
+
+    def _prune(self, heap, levels, sign):
+        # Drop levels emptied by cancellations
+        while heap:
+            queue = levels[sign * heap[0]]
+            while queue and queue[0].cancelled:
+                self.pool.release(queue.popleft())
+            if queue:
+                return
+            del levels[sign * heapq.heappop(heap)]
+
+    def submit(self, side, price, quantity, owner=None):
+        """Submit a limit order; returns the resting order's id or None if fully filled.
+
+        The id is an (order, generation) pair for `cancel`. Orders are
+        pooled, so once an order fills or is cancelled its object is reused
+        and the old id no longer matches. Use price=None for a market order,
+        which never rests.
+        """
+        if quantity <= 0:
+            return None
+        limit = self.to_ticks(price) if price is not None else None
+        if side == BUY:
+            remaining = self._match(quantity, owner, BUY, self._ask_heap, self._asks, 1, limit)
+        else:
+            remaining = self._match(quantity, owner, SELL, self._bid_heap, self._bids, -1, limit)
+
+        if remaining == 0 or price is None:
+            return None
+        order = self.pool.acquire(side, limit, remaining, owner)
+        heap, levels, sign = ((self._bid_heap, self._bids, -1) if side == BUY
+                              else (self._ask_heap, self._asks, 1))
+        queue = levels.get(limit)
+        if queue is None:
+            queue = levels[limit] = deque()
+            heapq.heappush(heap, sign * limit)
+        queue.append(order)
+        return order, order.generation
+
+    def _match(self, quantity, owner, side, heap, levels, sign, limit):
+        tick_size = self.tick_size
+        fills = self.fills
+        while quantity and heap:
+            level_ticks = sign * heap[0]
+            if limit is not None and (level_ticks > limit if side == BUY else level_ticks < limit):
+                break
+            queue = levels[level_ticks]
+            price = level_ticks * tick_size
+            while quantity and queue:
+                resting = queue[0]
+                if resting.cancelled:
+                    self.pool.release(queue.popleft())
+                    continue
+                traded = min(quantity, resting.remaining)
+                quantity -= traded
+                resting.remaining -= traded
+                self.volume += traded
+                self.last_price = price
+                if side == BUY:
+                    fills.append((owner, resting.owner, price, traded))
+                else:
+                    fills.append((resting.owner, owner, price, traded))
+                if not resting.remaining:
+                    self.pool.release(queue.popleft())
+            if not queue:
+                heapq.heappop(heap)
+                del levels[level_ticks]
+        return quantity
+
+    def cancel(self, order_id):
+        """Cancel a resting order by id; returns False if it already filled or was cancelled.
+
+        The order is removed lazily when next reached.
+        """
+        order, generation = order_id
+        if order.generation != generation or order.cancelled:
+            return False
+        order.cancelled = True
+        return True
+
+    def clear(self):
+        """Cancel everything resting and reset per-session statistics"""
+        for levels in (self._bids, self._asks):
+            for queue in levels.values():
+                for order in queue:
+                    self.pool.release(order)
+            levels.clear()
+        self._bid_heap.clear()
+        self._ask_heap.clear()
+        self.fills.clear()
+        self.last_price = None
+        self.volume = 0
+
+
+class OrderBookPriceModel:
+    """Forms each stock's daily price by matching agent orders in an OrderBook.
+
+    A market maker quotes a ladder around a mid price that moves with the
+    usual Gaussian news shock (or the market's shock_model, if set). Institutions submit limit orders whose size
+    scales with demand and capital and whose limit price gets more
+    aggressive with demand; retail investors send market orders. The close
+    is the last trade price.
+    """
+
+    def __init__(self, tick_size=0.01, maker_levels=10, maker_depth=5000, participation=0.01):
+        self.tick_size = tick_size
+        self.maker_levels = maker_levels
+        self.maker_depth = maker_depth
+        self.participation = participation  # Fraction of capital committed at full demand
+        self.pool = OrderPool()
+        self.books = {}
+
+    def run_day(self, market, inst_decisions, retail_decisions):
+        """Match one day of (investor, stock_name, demand) decisions.
+
+        Updates each stock's price, history and volume plus the investors'
+        capital and holdings, and returns per-stock (inst_notional,
+        retail_notional) dicts of signed traded dollar value.
+        """
+        inst_notional = {name: 0.0 for name in market.stocks}
+        retail_notional = {name: 0.0 for name in market.stocks}
+        orders = {name: [] for name in market.stocks}
+        retail_owners = set()
+        for investor, stock_name, demand in inst_decisions:
+            if stock_name and demand:
+                orders[stock_name].append((investor, demand, 1, False))
+        for investor, stock_name, demand in retail_decisions:
+            if stock_name and demand:
+                # Retail crosses the spread with market orders; cohort agents
+                # trade on behalf of all their members
+                orders[stock_name].append((investor, demand, investor.weight, True))
+                retail_owners.add(id(investor))
+
+        shock_model = getattr(market, 'shock_model', None)
+        shocks = shock_model.next(market.rng, list(market.stocks)) if shock_model is not None else None
+        for i, (stock_name, stock) in enumerate(market.stocks.items()):
+            book = self.books.get(stock_name)
+            if book is None:
+                book = self.books[stock_name] = OrderBook(self.tick_size, self.pool)
+            book.clear()
+
+            if shocks is None:
+                shock = market.rng.normal(0, stock.volatility / 2)
+            else:
+                shock = shocks[i] * stock.volatility / 2
+            mid = stock.price * (1 + shock)
+            spacing = mid * stock.volatility / self.maker_levels
+            for level in range(1, self.maker_levels + 1):
+                book.submit(BUY, max(self.tick_size, mid - level * spacing), self.maker_depth)
+                book.submit(SELL, mid + level * spacing, self.maker_depth)
+
+            for investor, demand, weight, market_order in orders[stock_name]:
+                quantity = abs(demand) * investor.capital * self.participation * weight / stock.price
+                side = BUY if demand > 0 else SELL
+                limit = None if market_order else max(self.tick_size, mid * (1 + side * abs(demand) * stock.volatility))
+                book.submit(side, limit, quantity, investor)
+
+            for buyer, seller, price, quantity in book.fills:
+                for owner, sign in ((buyer, 1), (seller, -1)):
+                    if owner is None:
+                        continue
+                    notional = sign * price * quantity
+                    owner.capital -= notional
+                    owner.holdings[stock_name] = owner.holdings.get(stock_name, 0) + sign * quantity
+                    if id(owner) in retail_owners:
+                        retail_notional[stock_name] += notional
+                    else:
+                        inst_notional[stock_name] += notional
+
+            stock.price = book.last_price if book.last_price is not None else max(self.tick_size, mid)
+            stock.volume = book.volume
+            stock.price_history.append(stock.price)
+
+        return inst_notional, retail_notional
+
+
+def benchmark_throughput(n_orders=200000, seed=0, market_order_share=0.1):
+    """Random order flow around a $100 mid; returns orders per second"""
+    rng = np.random.default_rng(seed)
+    sides = np.where(rng.random(n_orders) < 0.5, BUY, SELL).tolist()
+    prices = (100 + rng.normal(0, 0.5, n_orders)).round(2).tolist()
+    quantities = rng.integers(1, 500, n_orders).tolist()
+    is_market = (rng.random(n_orders) < market_order_share).tolist()
+
+    book = OrderBook()
+    start = time.perf_counter()
+    for side, price, quantity, market in zip(sides, prices, quantities, is_market):
+        book.submit(side, None if market else price, quantity)
+        if len(book.fills) > 10000:
+            book.fills.clear()
+    elapsed = time.perf_counter() - start
+    return n_orders / elapsed
+
+
+if __name__ == "__main__":
+    print(f"{benchmark_throughput():,.0f} orders/sec")
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+class PortfolioLedger:
+    """Positions, cash and P&L for every investor in every stock.
+
+    State lives in dense (investors, stocks) arrays using average-cost
+    accounting: `positions` in shares (negative when short), `avg_cost`
+    per share of the open position and `realized` P&L from closed shares.
+    A day's fills are applied in one vectorized call; shares bought and
+    sold by the same investor in the same stock on one day are matched
+    against each other first, then the net trade opens, adds to, reduces
+    or flips the position.
+    """
+
+    def __init__(self, investor_names, stock_names, initial_cash):
+        self.investor_names = list(investor_names)
+        self.stock_names = list(stock_names)
+        shape = (len(self.investor_names), len(self.stock_names))
+        self.cash = np.array(np.broadcast_to(np.asarray(initial_cash, dtype=float), shape[:1]))
+        self.initial_cash = self.cash.copy()
+        self.positions = np.zeros(shape)
+        self.avg_cost = np.zeros(shape)
+        self.realized = np.zeros(shape)
+        self.last_prices = np.zeros(shape[1])
+        self.trade_count = 0
+
+    def apply_fills(self, investors, stocks, quantities, prices):
+        """Apply fills given as parallel arrays; positive quantities are buys"""
+        investors = np.asarray(investors, dtype=np.intp)
+        stocks = np.asarray(stocks, dtype=np.intp)
+        quantities = np.asarray(quantities, dtype=float)
+        prices = np.broadcast_to(np.asarray(prices, dtype=float), quantities.shape)
+        traded = quantities != 0
+        if not traded.any():
+            return
+        investors, stocks, quantities, prices = (investors[traded], stocks[traded],
+                                                 quantities[traded], prices[traded])
+        self.trade_count += len(quantities)
+
+        # Cells are addressed by flat index into the (investors, stocks) arrays
+        n_stocks = self.positions.shape[1]
+        if len(investors) < 2 or (np.diff(investors) > 0).all():
+            # One fill per investor (the simulators' usual case): nothing to aggregate
+            cells = investors * n_stocks + stocks
+            self.cash[investors] -= quantities * prices
+            net = quantities
+            trade_price = prices
+            realized = np.zeros(len(cells))
+        else:
+            cells, net, trade_price, realized = self._aggregate(investors * n_stocks + stocks,
+                                                                quantities, prices)
+
+        # The net trade per cell goes against the open position
+        positions = self.positions.reshape(-1)
+        avg_costs = self.avg_cost.reshape(-1)
+        position = positions[cells]
+        avg_cost = avg_costs[cells]
+        closing = net * position < 0
+        closed = np.where(closing, np.minimum(np.abs(net), np.abs(position)), 0.0)
+        realized += closed * np.sign(position) * (trade_price - avg_cost)
+
+        # Opening or adding blends the cost, reducing keeps it and flipping
+        # starts the new position at the trade price
+        new_position = position + net
+        blended = np.divide(position * avg_cost + net * trade_price, new_position,
+                            out=np.zeros_like(new_position), where=new_position != 0)
+        flipped = np.abs(net) > np.abs(position)
+        new_cost = np.where(closing, np.where(flipped, trade_price, avg_cost), blended)
+        new_cost[new_position == 0] = 0.0
+
+        positions[cells] = new_position
+        avg_costs[cells] = new_cost
+        self.realized.reshape(-1)[cells] += realized
+
+    def _aggregate(self, cell_ids, quantities, prices):
+        """Net each cell's fills, returning (cells, net quantity, price, realized P&L)"""
+        cells, cell_index = np.unique(cell_ids, return_inverse=True)
+        buys = np.where(quantities > 0, quantities, 0.0)
+        sells = np.where(quantities < 0, -quantities, 0.0)
+        buy_qty = np.bincount(cell_index, weights=buys, minlength=len(cells))
+        sell_qty = np.bincount(cell_index, weights=sells, minlength=len(cells))
+        buy_value = np.bincount(cell_index, weights=buys * prices, minlength=len(cells))
+        sell_value = np.bincount(cell_index, weights=sells * prices, minlength=len(cells))
+        np.add.at(self.cash, cells // self.positions.shape[1], sell_value - buy_value)
+
+        # Intraday round trips realize at the difference of the day's average prices
+        buy_price = np.divide(buy_value, buy_qty, out=np.zeros_like(buy_value), where=buy_qty > 0)
+        sell_price = np.divide(sell_value, sell_qty, out=np.zeros_like(sell_value), where=sell_qty > 0)
+        realized = np.minimum(buy_qty, sell_qty) * (sell_price - buy_price)
+        net = buy_qty - sell_qty
+        return cells, net, np.where(net > 0, buy_price, sell_price), realized
+
+    def mark(self, prices):
+        """Record closing prices used for unrealized P&L and equity"""
+        self.last_prices = np.asarray(prices, dtype=float).copy()
+
+    @property
+    def unrealized(self):
+        return self.positions * (self.last_prices - self.avg_cost)
+
+    @property
+    def equity(self):
+        """Cash plus positions marked at the last prices, per investor"""
+        return self.cash + self.positions @ self.last_prices
+
+    def pnl(self):
+        """Total (realized + unrealized) P&L per investor"""
+        return self.equity - self.initial_cash
+
+    def to_frame(self):
+        """One row per investor with cash, equity and P&L totals"""
+        return pd.DataFrame({
+            'investor': self.investor_names,
+            'cash': self.cash,
+            'equity': self.equity,
+            'realized_pnl': self.realized.sum(axis=1),
+            'unrealized_pnl': self.unrealized.sum(axis=1),
+            'total_pnl': self.pnl(),
+        })
+
+    def group_pnl(self, members):
+        """Per-stock total P&L of the investors selected by `members` (mask or indices)"""
+        return (self.realized[members] + self.unrealized[members]).sum(axis=0)
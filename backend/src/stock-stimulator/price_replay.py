@@ -0,0 +1,110 @@
+import bisect
+import json
+import numpy as np
+
+REPLAY_MODES = ('prices', 'shocks')
+
+
+class PriceReplay:
+    """Historical prices (or shocks) fed to a simulator one day at a time.
+
+    In 'prices' mode each stock's price is set to the recorded value and
+    agents react to it; in 'shocks' mode the recorded value replaces the
+    Gaussian noise term of the usual price update. Data is read lazily, so
+    multi-GB histories open instantly and only the pages for the days
+    actually simulated are touched.
+    """
+
+    def __init__(self, source, tickers, mode='prices', start_day=0):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.source = source  # Anything indexable as source[day, columns]
+        self.tickers = list(tickers)
+        self.mode = mode
+        self.start_day = start_day
+        self._ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._columns = None
+        self._stock_names = None
+
+    @classmethod
+    def from_npy(cls, path, tickers=None, mode='prices', start_day=0):
+        """Memory-map a (days, tickers) .npy file; tickers default to its sidecar"""
+        values = np.load(path, mmap_mode='r')
+        if tickers is None:
+            with open(_tickers_path(path)) as f:
+                tickers = json.load(f)
+        return cls(values, tickers, mode, start_day)
+
+    @classmethod
+    def from_parquet(cls, path, tickers=None, mode='prices', start_day=0):
+        """Read ticker columns of a Parquet file one row group at a time"""
+        source = ParquetColumns(path)
+        return cls(source, tickers or source.columns, mode, start_day)
+
+    def __len__(self):
+        return len(self.source) - self.start_day
+
+    def row(self, day, stock_names):
+        """Values for simulated day `day` (1-based) ordered like `stock_names`"""
+        if stock_names != self._stock_names:
+            missing = [name for name in stock_names if name not in self._ticker_index]
+            if missing:
+                raise KeyError(f"No replay data for: {', '.join(missing)}")
+            self._columns = np.array([self._ticker_index[name] for name in stock_names])
+            self._stock_names = list(stock_names)
+        index = self.start_day + day - 1
+        if index >= len(self.source):
+            raise IndexError(f"Replay data ends after day {len(self)}")
+        return np.asarray(self.source[index, self._columns], dtype=float)
+
+
+class ParquetColumns:
+    """Row-indexable view of a Parquet file that decodes one row group at a time"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet replay requires pyarrow: pip install pyarrow") from exc
+        self._file = pq.ParquetFile(path, memory_map=True)
+        metadata = self._file.metadata
+        self.columns = [name for name in self._file.schema_arrow.names if name != 'date']
+        self._starts = np.cumsum([0] + [metadata.row_group(i).num_rows
+                                        for i in range(metadata.num_row_groups)]).tolist()
+        self._cached_key = None
+        self._cached_values = None
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def __getitem__(self, key):
+        row, columns = key
+        group = bisect.bisect_right(self._starts, row) - 1
+        cache_key = (group, tuple(np.atleast_1d(columns).tolist()))
+        if cache_key != self._cached_key:
+            # Only the requested tickers' column chunks are decoded
+            names = [self.columns[i] for i in cache_key[1]]
+            table = self._file.read_row_group(group, columns=names)
+            self._cached_values = np.column_stack([table.column(name).to_numpy() for name in names])
+            self._cached_key = cache_key
+        return self._cached_values[row - self._starts[group]]
+
+
+def _tickers_path(path):
+    return f"{path}.tickers.json"
+
+
+def write_npy_replay(path, values, tickers):
+    """Save a (days, tickers) array plus its ticker sidecar for from_npy.
+
+    Returns the .npy path to pass to PriceReplay.from_npy.
+    """
+    if not path.endswith('.npy'):
+        path += '.npy'
+    values = np.asarray(values, dtype=float)
+    if values.shape[1] != len(tickers):
+        raise ValueError("values must have one column per ticker")
+    np.save(path, values)
+    with open(_tickers_path(path), 'w') as f:
+        json.dump(list(tickers), f)
+    return path
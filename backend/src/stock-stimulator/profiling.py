@@ -0,0 +1,81 @@
+import time
+import numpy as np
+
+# Phases of one simulated day, in execution order
+PHASES = ('signals', 'institutional', 'retail', 'price_update', 'bookkeeping')
+
+
+class SimulationProfiler:
+    """Opt-in per-phase instrumentation for the market simulators.
+
+    Attach with `sim.profiler = SimulationProfiler()`. Simulators check the
+    attribute once per phase, so leaving it as None costs only that check.
+    Callbacks are called as `callback(phase, seconds, day)` after every
+    timed phase, e.g. to forward timings to a metrics system. With
+    `sample_every=N`, every Nth agent decision is timed individually
+    (object-model simulator only; the vectorized engine has no per-agent
+    calls).
+    """
+
+    def __init__(self, callbacks=(), sample_every=0, max_samples=100000):
+        self.callbacks = list(callbacks)
+        self.sample_every = sample_every
+        self.max_samples = max_samples
+        self.reset()
+
+    def reset(self):
+        self.wall_time = {phase: 0.0 for phase in PHASES}
+        self.calls = {phase: 0 for phase in PHASES}
+        self.decision_samples = {}
+        self._decision_counter = 0
+
+    def record(self, phase, seconds, day=None):
+        self.wall_time[phase] = self.wall_time.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        for callback in self.callbacks:
+            callback(phase, seconds, day)
+
+    def sample_decision(self):
+        """Whether the next agent decision should be timed"""
+        if not self.sample_every:
+            return False
+        self._decision_counter += 1
+        return self._decision_counter % self.sample_every == 0
+
+    def record_decision(self, kind, seconds):
+        samples = self.decision_samples.setdefault(kind, [])
+        if len(samples) < self.max_samples:
+            samples.append(seconds)
+
+    def report(self):
+        """Structured summary of phase timings and sampled decision latency"""
+        total = sum(self.wall_time.values())
+        phases = {}
+        for phase, seconds in self.wall_time.items():
+            calls = self.calls[phase]
+            phases[phase] = {
+                'total_s': seconds,
+                'calls': calls,
+                'mean_ms': seconds / calls * 1000 if calls else 0.0,
+                'share': seconds / total if total else 0.0,
+            }
+        decisions = {}
+        for kind, samples in self.decision_samples.items():
+            values = np.array(samples) * 1e6
+            decisions[kind] = {
+                'samples': len(values),
+                'mean_us': values.mean(),
+                'p50_us': np.percentile(values, 50),
+                'p99_us': np.percentile(values, 99),
+            }
+        return {'total_s': total, 'phases': phases, 'decisions': decisions}
+
+
+def timed_decision(profiler, kind, decide, market):
+    """Call `decide(market)`, timing it if the profiler samples this decision"""
+    if not profiler.sample_decision():
+        return decide(market)
+    start = time.perf_counter()
+    result = decide(market)
+    profiler.record_decision(kind, time.perf_counter() - start)
+    return result
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Regime labels, stored as int8 in a (days, stocks) array
+UNLABELLED = 0
+ACCUMULATION = 1  # Institutions buy while the price is still flat
+PUMP = 2          # Institutions keep buying into a rising price
+DISTRIBUTION = 3  # Heavy institutional selling
+REGIME_NAMES = ('unlabelled', 'accumulation', 'pump', 'distribution')
+
+
+def selling_thresholds(inst_flow, percentile):
+    """Per-column percentile of the negative flows in a (days, stocks) block.
+
+    Columns without any selling get -inf, so no day falls below them.
+    """
+    thresholds = np.full(inst_flow.shape[1], -np.inf)
+    selling = np.where(inst_flow < 0, inst_flow, np.nan)
+    has_selling = (inst_flow < 0).any(axis=0)
+    if has_selling.any():
+        thresholds[has_selling] = np.nanpercentile(selling[:, has_selling], percentile, axis=0)
+    return thresholds
+
+
+def run_length_encode(labels):
+    """Runs of equal values down each column of a (days, columns) array.
+
+    Returns parallel `(column, start, end, value)` arrays ordered by column
+    then start, with `end` exclusive.
+    """
+    labels = np.asarray(labels)
+    if labels.ndim == 1:
+        labels = labels[:, None]
+    days, columns = labels.shape
+    by_column = labels.T
+    starts = np.ones((columns, days), dtype=bool)
+    starts[:, 1:] = by_column[:, 1:] != by_column[:, :-1]
+    column, start = np.nonzero(starts)
+    # Each run ends where the next one starts; every column's first run starts at day 0
+    flat_start = column * days + start
+    end = np.append(flat_start[1:], columns * days) - column * days
+    return column, start, end, by_column[column, start]
+
+
+def label_regimes(price, inst_flow, window=10, pump_return=0.05, distribution_percentile=25):
+    """Label every (day, stock) of the blocks with a regime.
+
+    Distribution days have institutional flow at or below the stock's
+    `distribution_percentile` of selling. Days of institutional buying are
+    pump days when the price has risen more than `pump_return` over the
+    trailing `window` days (or since the start, early on) and accumulation
+    days otherwise. The first day has no prior price and stays unlabelled.
+    """
+    price = np.asarray(price, dtype=float)
+    inst_flow = np.asarray(inst_flow, dtype=float)
+    labels = np.zeros(price.shape, dtype=np.int8)
+    if len(price) < 2:
+        return labels
+
+    base = np.empty_like(price)
+    base[:window] = price[0]
+    base[window:] = price[:-window]
+    trailing_return = price / base - 1
+
+    buying = inst_flow > 0
+    labels[buying] = ACCUMULATION
+    labels[buying & (trailing_return > pump_return)] = PUMP
+    labels[inst_flow <= selling_thresholds(inst_flow, distribution_percentile)] = DISTRIBUTION
+    labels[0] = UNLABELLED
+    return labels
+
+
+def segment_regimes(price, inst_flow, retail_flow, stock_names, dates=None, min_days=1, **label_options):
+    """Accumulation, pump and distribution runs for all stocks in one pass.
+
+    Takes (days, stocks) blocks and returns one row per run with its
+    start/end day indices (end exclusive), duration and aggregates over the
+    run: price change from the day before it starts to its last day,
+    summed institutional and retail flow, and the wealth transfer (retail
+    buying while institutions sell). Runs shorter than `min_days` are
+    dropped. Extra keyword arguments go to `label_regimes`.
+    """
+    price = np.asarray(price, dtype=float)
+    inst_flow = np.asarray(inst_flow, dtype=float)
+    retail_flow = np.asarray(retail_flow, dtype=float)
+    labels = label_regimes(price, inst_flow, **label_options)
+    column, start, end, regime = run_length_encode(labels)
+    keep = (regime != UNLABELLED) & (end - start >= min_days)
+    column, start, end, regime = column[keep], start[keep], end[keep], regime[keep]
+
+    # Per-run sums from column-wise cumulative sums with a leading zero row
+    def run_sums(values):
+        totals = np.zeros((len(values) + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=totals[1:])
+        return totals[end, column] - totals[start, column]
+
+    wealth_transfer = -inst_flow * ((retail_flow > 0) & (inst_flow < 0))
+    segments = pd.DataFrame({
+        'stock': np.asarray(stock_names, dtype=object)[column],
+        'regime': np.asarray(REGIME_NAMES, dtype=object)[regime],
+        'start': start,
+        'end': end,
+        'duration': end - start,
+        'price_change': price[end - 1, column] / price[np.maximum(start - 1, 0), column] - 1,
+        'inst_flow': run_sums(inst_flow),
+        'retail_flow': run_sums(retail_flow),
+        'wealth_transfer': run_sums(wealth_transfer),
+    })
+    if dates is not None:
+        dates = np.asarray(dates)
+        segments.insert(4, 'start_date', dates[start])
+        segments.insert(5, 'end_date', dates[end - 1])
+    return segments
+
+
+def segment_frame(data, stock_names=None, **options):
+    """segment_regimes over a simulation's wide `{stock}_{metric}` frame"""
+    if stock_names is None:
+        stock_names = [col[:-len('_price')] for col in data.columns if col.endswith('_price')]
+
+    def block(metric):
+        return data[[f'{stock_name}_{metric}' for stock_name in stock_names]].to_numpy(dtype=float)
+
+    dates = data['date'].to_numpy() if 'date' in data.columns else None
+    return segment_regimes(block('price'), block('inst_flow'), block('retail_flow'),
+                           stock_names, dates, **options)
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity float64 ring buffer of the most recent values.
+
+    Every value is written twice, `capacity` slots apart, so the most recent
+    `n` values are always one contiguous slice of the backing array and
+    `last(n)` can return a view instead of assembling a copy.
+    """
+
+    __slots__ = ('capacity', '_data', '_head', '_count')
+
+    def __init__(self, capacity, shape=()):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = np.zeros((2 * capacity,) + tuple(shape))
+        self._head = 0  # Slot the next value goes to
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        head = self._head
+        self._data[head] = value
+        self._data[head + self.capacity] = value
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def last(self, n=None):
+        """Read-only view of the last `n` values, oldest first"""
+        n = self._count if n is None else min(n, self._count)
+        end = self._head + self.capacity
+        view = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def latest(self):
+        if not self._count:
+            raise IndexError("ring buffer is empty")
+        return self._data[self._head + self.capacity - 1]
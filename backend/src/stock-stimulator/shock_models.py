@@ -0,0 +1,137 @@
+import numpy as np
+
+
+class FactorShockModel:
+    """Correlated daily shocks from a linear factor model.
+
+    Standardized shock for stock i is `loadings[i] @ f + idio[i] * e_i`
+    with factors f ~ N(0, factor_cov) and independent e ~ N(0, 1). The
+    idiosyncratic scale is chosen so every stock has unit variance, so the
+    simulators keep scaling by each stock's own volatility. The factor
+    Cholesky factor is computed once; a day then costs one
+    (stocks x factors) matrix-vector product. Shocks are drawn
+    `block_days` at a time and handed out one day per step.
+    """
+
+    def __init__(self, tickers, loadings, factor_cov=None, block_days=64):
+        self.tickers = list(tickers)
+        self.loadings = np.asarray(loadings, dtype=float)
+        n_factors = self.loadings.shape[1]
+        if factor_cov is None:
+            factor_cov = np.eye(n_factors)
+        self.factor_cov = np.asarray(factor_cov, dtype=float)
+        self.block_days = block_days
+        self._factor_chol = np.linalg.cholesky(self.factor_cov)
+        systematic = np.einsum('ij,jk,ik->i', self.loadings, self.factor_cov, self.loadings)
+        if (systematic > 1 + 1e-9).any():
+            raise ValueError("Factor variance exceeds 1 for some stocks; scale down the loadings")
+        self._idio = np.sqrt(np.clip(1 - systematic, 0, None))
+        self._ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._columns = None
+        self._stock_names = None
+        self._block = None
+        self._next_row = 0
+
+    @property
+    def n_factors(self):
+        return self.loadings.shape[1]
+
+    def _systematic(self, factors):
+        # (days, factors) -> (days, stocks)
+        return factors @ self.loadings.T
+
+    def draw(self, rng, n_days):
+        """Standardized shocks for `n_days`, shaped (n_days, tickers)"""
+        factors = rng.standard_normal((n_days, self.n_factors)) @ self._factor_chol.T
+        idio = rng.standard_normal((n_days, len(self.tickers))) * self._idio
+        return self._systematic(factors) + idio
+
+    def next(self, rng, stock_names):
+        """Next day's standardized shocks ordered like `stock_names`"""
+        if stock_names != self._stock_names:
+            missing = [name for name in stock_names if name not in self._ticker_index]
+            if missing:
+                raise KeyError(f"No shock model entry for: {', '.join(missing)}")
+            self._columns = np.array([self._ticker_index[name] for name in stock_names], dtype=np.intp)
+            self._stock_names = list(stock_names)
+            self._block = None  # Discard shocks drawn for the old layout
+        if self._block is None or self._next_row == len(self._block):
+            self._block = self.draw(rng, self.block_days)[:, self._columns]
+            self._next_row = 0
+        shocks = self._block[self._next_row]
+        self._next_row += 1
+        return shocks
+
+    def reset(self):
+        """Discard shocks drawn ahead, e.g. when the simulation's generator is reseeded"""
+        self._block = None
+        self._next_row = 0
+
+    def correlation(self):
+        """Implied (tickers x tickers) correlation matrix; dense, for inspection"""
+        corr = self.loadings @ self.factor_cov @ self.loadings.T
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+
+class SectorShockModel(FactorShockModel):
+    """Market plus one-sector-per-stock model with a sparse loading structure.
+
+    Each stock loads `sqrt(market_share)` on a common market factor and
+    `sqrt(sector_share)` on its own sector factor, giving a correlation of
+    `market_share + sector_share` within a sector and `market_share` across
+    sectors. Sector factors are gathered by index instead of multiplied
+    through a mostly-zero loading matrix.
+    """
+
+    def __init__(self, tickers, sectors, market_share=0.2, sector_share=0.3, block_days=64):
+        if market_share + sector_share > 1:
+            raise ValueError("market_share + sector_share must not exceed 1")
+        self.sector_names, self.sector_index = np.unique(np.asarray(sectors), return_inverse=True)
+        self.market_share = market_share
+        self.sector_share = sector_share
+        n_sectors = len(self.sector_names)
+        loadings = np.zeros((len(self.sector_index), 1 + n_sectors))
+        loadings[:, 0] = np.sqrt(market_share)
+        loadings[np.arange(len(self.sector_index)), 1 + self.sector_index] = np.sqrt(sector_share)
+        super().__init__(tickers, loadings, block_days=block_days)
+
+    def _systematic(self, factors):
+        return (np.sqrt(self.market_share) * factors[:, :1]
+                + np.sqrt(self.sector_share) * factors[:, 1 + self.sector_index])
+
+
+class TrackedShocks:
+    """Shock model that can flip the sign of its draws and keeps running sums of them.
+
+    Wraps another shock model, or plain independent standard normals when
+    `base` is None, which consume the generator exactly like the default
+    noise draw. With `sign=-1` a run replays the same seed with every price
+    shock negated (its antithetic twin). `cumulative` holds each stock's
+    sum of standardized shocks and `excess_squares` its sum of `z**2 - 1`.
+    Both have known mean zero, so Monte Carlo estimators can use them as
+    control variates; only the second survives averaging with the twin.
+    """
+
+    def __init__(self, base=None, sign=1.0):
+        self.base = base
+        self.sign = sign
+        self.cumulative = None
+        self.excess_squares = None
+
+    def reset(self):
+        if self.base is not None:
+            self.base.reset()
+
+    def next(self, rng, stock_names):
+        if self.base is not None:
+            shocks = self.base.next(rng, stock_names)
+        else:
+            shocks = rng.standard_normal(len(stock_names))
+        shocks = self.sign * shocks
+        if self.cumulative is None or len(self.cumulative) != len(shocks):
+            self.cumulative = np.zeros(len(shocks))
+            self.excess_squares = np.zeros(len(shocks))
+        self.cumulative += shocks
+        self.excess_squares += shocks ** 2 - 1
+        return shocks
@@ -0,0 +1,111 @@
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+from money_flow_store import MoneyFlowStore, METRICS
+from ring_buffer import RingBuffer
+
+
+class Sink:
+    """Receives chunks of simulated days as MoneyFlowStore instances"""
+
+    def write(self, chunk):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CsvSink(Sink):
+    """Appends each chunk to a CSV file with the get_data_frame layout"""
+
+    def __init__(self, path):
+        self.path = path
+        self._header_written = os.path.exists(path) and os.path.getsize(path) > 0
+
+    def write(self, chunk):
+        chunk.to_frame(copy=False).to_csv(self.path, mode='a', header=not self._header_written, index=False)
+        self._header_written = True
+
+
+class ParquetSink(Sink):
+    """Writes each chunk as one Parquet row group (requires pyarrow)"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("ParquetSink requires pyarrow: pip install pyarrow") from exc
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self._writer = None
+
+    def write(self, chunk):
+        table = self._pa.Table.from_pandas(chunk.to_frame(copy=False), preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class MemoryRingSink(Sink):
+    """Keeps only the most recent `max_days` days in memory"""
+
+    def __init__(self, max_days):
+        self.max_days = max_days
+        self.stock_names = None
+        self._values = None
+        self._dates = deque(maxlen=max_days)
+
+    def write(self, chunk):
+        if self._values is None:
+            self.stock_names = list(chunk.stock_names)
+            self._values = RingBuffer(self.max_days, (len(self.stock_names), len(METRICS)))
+        for date, row in zip(chunk.dates, chunk.values):
+            self._values.append(row)
+            self._dates.append(date)
+
+    def __len__(self):
+        return len(self._dates)
+
+    def to_frame(self):
+        """Copy of the retained days in the get_data_frame layout"""
+        if self._values is None:
+            return pd.DataFrame()
+        store = MoneyFlowStore(self.stock_names, len(self))
+        for date, row in zip(self._dates, self._values.last()):
+            store.append(date, *np.asarray(row).T)
+        return store.to_frame()
+
+
+def stream_simulation(sim, days, sinks, chunk_days=256, record=False):
+    """Run `days` days of `sim`, handing every `chunk_days` days to each sink.
+
+    With record=False (the default) nothing accumulates in the simulator's
+    own output store, so memory is bounded by the chunk size. Sinks are
+    flushed with the final partial chunk but not closed.
+    """
+    stock_names = list(sim.stocks.keys())
+    chunk = MoneyFlowStore(stock_names, chunk_days)
+    for day in sim.iter_days(days, record=record):
+        chunk.append(*day)
+        if chunk.length == chunk_days:
+            for sink in sinks:
+                sink.write(chunk)
+            # Sinks may hold on to views of the last chunk, so start a fresh one
+            chunk = MoneyFlowStore(stock_names, chunk_days)
+    if chunk.length:
+        for sink in sinks:
+            sink.write(chunk)
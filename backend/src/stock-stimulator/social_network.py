@@ -0,0 +1,78 @@
+import numpy as np
+
+
+def _sparse():
+    try:
+        import scipy.sparse as sparse
+    except ImportError as exc:
+        raise ImportError("Social networks require scipy: pip install scipy") from exc
+    return sparse
+
+
+class SocialNetwork:
+    """Herding between retail agents over a sparse social graph.
+
+    Each agent's sentiment is a smoothed record of its own recent demand.
+    Every day an agent's FOMO becomes its base FOMO scaled by
+    `1 + influence * s`, where `s` is the average sentiment of its
+    neighbours: buying neighbours raise FOMO, selling neighbours damp it.
+    The averaging is a single sparse matrix-vector product with the
+    row-normalized adjacency matrix, which is built once.
+    """
+
+    def __init__(self, adjacency, influence=0.5, memory=0.5):
+        sparse = _sparse()
+        adjacency = sparse.csr_matrix(adjacency, dtype=float, copy=True)
+        if adjacency.shape[0] != adjacency.shape[1]:
+            raise ValueError("adjacency must be square")
+        # Row-normalize in place so each row averages over the agent's neighbours
+        degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        inverse = np.divide(1.0, degree, out=np.zeros_like(degree), where=degree > 0)
+        adjacency.data *= np.repeat(inverse, np.diff(adjacency.indptr))
+        self.weights = adjacency
+        self.influence = influence
+        self.memory = memory  # Share of yesterday's sentiment that carries over
+        self.sentiment = np.zeros(adjacency.shape[0])
+
+    @classmethod
+    def from_edges(cls, sources, targets, n_agents, influence=0.5, memory=0.5, directed=False):
+        """Build from edge lists; undirected edges influence both endpoints"""
+        sparse = _sparse()
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if not directed:
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+        keep = sources != targets
+        # Duplicate edges are summed on conversion, then counted once
+        adjacency = sparse.csr_matrix((np.ones(keep.sum()), (sources[keep], targets[keep])),
+                                      shape=(n_agents, n_agents))
+        adjacency.data[:] = 1.0
+        return cls(adjacency, influence, memory)
+
+    @classmethod
+    def random(cls, n_agents, mean_degree=10, rng=None, influence=0.5, memory=0.5):
+        """Erdős–Rényi style random graph with about `mean_degree` neighbours per agent"""
+        rng = np.random.default_rng(rng)
+        n_edges = int(n_agents * mean_degree / 2)
+        sources = rng.integers(0, n_agents, n_edges)
+        targets = rng.integers(0, n_agents, n_edges)
+        return cls.from_edges(sources, targets, n_agents, influence, memory)
+
+    def __len__(self):
+        return len(self.sentiment)
+
+    @property
+    def n_edges(self):
+        return self.weights.nnz
+
+    def fomo(self, base_fomo):
+        """Today's FOMO factors given each agent's base FOMO"""
+        if len(base_fomo) != len(self.sentiment):
+            raise ValueError(f"Network has {len(self.sentiment)} agents but the market has {len(base_fomo)}")
+        neighbour_sentiment = self.weights @ self.sentiment
+        return base_fomo * np.maximum(0.0, 1 + self.influence * neighbour_sentiment)
+
+    def observe(self, actions):
+        """Fold each agent's demand for the day into its sentiment"""
+        self.sentiment *= self.memory
+        self.sentiment += (1 - self.memory) * actions
@@ -0,0 +1,170 @@
+import numpy as np
+from market_signals import RETAIL_TREND_LOOKBACK
+
+# Registered institutional strategies by name
+STRATEGIES = {}
+
+NO_TARGET = -1
+
+# Phase codes for the pump-and-dump state machine
+ACCUMULATION = 0
+PUMP = 1
+DISTRIBUTION = 2
+
+
+def register_strategy(name):
+    """Class decorator adding a batched strategy kernel to STRATEGIES.
+
+    A strategy provides `init_state(count, rng)`, returning a dict of per-investor
+    state arrays, and `step(state, snapshot, rng, n_stocks)`, which updates
+    that state in place and returns `(targets, actions)` arrays: the stock
+    index each investor trades (NO_TARGET for none) and its demand in
+    [-1, 1]. Every call covers all investors using the strategy at once.
+    """
+    def decorator(cls):
+        STRATEGIES[name] = cls()
+        return cls
+    return decorator
+
+
+def get_strategy(name):
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown strategy: {name}") from None
+
+
+def _strongest(values):
+    """Index of the largest absolute value, NaN treated as no signal"""
+    return int(np.argmax(np.nan_to_num(np.abs(values), nan=-1.0)))
+
+
+@register_strategy("pump_and_dump")
+class PumpAndDumpStrategy:
+    """Accumulate quietly, pump, then distribute into retail demand"""
+
+    # Default days spent accumulating, pumping and distributing
+    phase_lengths = (20, 10, 15)
+
+    def init_state(self, count, rng):
+        return {
+            'phase': np.full(count, ACCUMULATION, dtype=np.int8),
+            'phase_counter': np.zeros(count, dtype=np.int32),
+            'target': np.full(count, NO_TARGET, dtype=np.int32),
+            # Per-investor phase lengths, one column per phase
+            'phase_lengths': np.tile(np.array(self.phase_lengths, dtype=np.int32), (count, 1)),
+        }
+
+    def step(self, state, snapshot, rng, n_stocks):
+        phase = state['phase']
+        counter = state['phase_counter']
+        target = state['target']
+        lengths = state['phase_lengths']
+        count = len(target)
+
+        # Idle investors occasionally select a new target
+        idle = target == NO_TARGET
+        selecting = idle & (rng.random(count) < 0.1)
+        n_selecting = int(selecting.sum())
+        if n_selecting:
+            target[selecting] = rng.integers(0, n_stocks, n_selecting)
+            phase[selecting] = ACCUMULATION
+            counter[selecting] = 0
+
+        active = target != NO_TARGET
+        noise = rng.random(count)
+        action = np.select(
+            [phase == ACCUMULATION, phase == PUMP, phase == DISTRIBUTION],
+            [0.3 + noise * 0.2, 0.7 + noise * 0.3, -0.8 - noise * 0.2])
+        action[~active] = 0.0
+        targets = target.copy()
+
+        # Advance the phase machines of active investors
+        counter[active] += 1
+        to_pump = active & (phase == ACCUMULATION) & (counter > lengths[:, ACCUMULATION])
+        to_distribution = active & (phase == PUMP) & (counter > lengths[:, PUMP])
+        finished = active & (phase == DISTRIBUTION) & (counter > lengths[:, DISTRIBUTION])
+        phase[to_pump] = PUMP
+        phase[to_distribution] = DISTRIBUTION
+        counter[to_pump | to_distribution] = 0
+        # The target is released before the last distribution order goes out,
+        # matching InstitutionalInvestor._pump_and_dump_strategy
+        target[finished] = NO_TARGET
+        targets[finished] = NO_TARGET
+        return targets, action
+
+
+@register_strategy("momentum")
+class MomentumStrategy:
+    """Trade in the direction of the strongest recent trend"""
+
+    lookback = RETAIL_TREND_LOOKBACK
+    gain = 5.0
+
+    def init_state(self, count, rng):
+        # Per-investor conviction scales how hard each one follows the signal
+        return {'conviction': 0.5 + rng.random(count)}
+
+    def step(self, state, snapshot, rng, n_stocks):
+        conviction = state['conviction']
+        count = len(conviction)
+        trend = snapshot.trend[self.lookback]
+        if np.isnan(trend).all():
+            return np.full(count, NO_TARGET), np.zeros(count)
+        stock = _strongest(trend)
+        action = np.clip(trend[stock] * self.gain * conviction, -1.0, 1.0)
+        return np.full(count, stock), action
+
+
+@register_strategy("mean_reversion")
+class MeanReversionStrategy:
+    """Fade the stock furthest from its moving average"""
+
+    window = 20
+    gain = 10.0
+
+    def init_state(self, count, rng):
+        return {'conviction': 0.5 + rng.random(count)}
+
+    def step(self, state, snapshot, rng, n_stocks):
+        conviction = state['conviction']
+        count = len(conviction)
+        deviation = snapshot.price / snapshot.moving_average[self.window] - 1
+        if np.isnan(deviation).all():
+            return np.full(count, NO_TARGET), np.zeros(count)
+        stock = _strongest(deviation)
+        action = np.clip(-deviation[stock] * self.gain * conviction, -1.0, 1.0)
+        return np.full(count, stock), action
+
+
+@register_strategy("iceberg_accumulation")
+class IcebergAccumulationStrategy:
+    """Build a position in small daily slices to stay under the radar"""
+
+    min_days = 20
+    max_days = 60
+
+    def init_state(self, count, rng):
+        return {
+            'target': np.full(count, NO_TARGET, dtype=np.int32),
+            'days_left': np.zeros(count, dtype=np.int32),
+        }
+
+    def step(self, state, snapshot, rng, n_stocks):
+        target = state['target']
+        days_left = state['days_left']
+        count = len(target)
+
+        idle = target == NO_TARGET
+        n_idle = int(idle.sum())
+        if n_idle:
+            target[idle] = rng.integers(0, n_stocks, n_idle)
+            days_left[idle] = rng.integers(self.min_days, self.max_days + 1, n_idle)
+
+        # Small, slightly randomized slices so the flow never stands out
+        action = 0.1 + rng.random(count) * 0.1
+        targets = target.copy()
+
+        days_left -= 1
+        target[days_left <= 0] = NO_TARGET
+        return targets, action
@@ -0,0 +1,192 @@
+import hashlib
+import itertools
+import json
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from market_simulator import MarketSimulator
+from monte_carlo import SUMMARY_METRICS, summarize_run
+
+STOCK_NAMES = ["TECH", "ENERGY", "FINANCE", "HEALTH", "RETAIL",
+               "CRYPTO", "TELECOM", "AUTO", "DEFENSE", "FOOD"]
+
+# Sweepable parameters and their defaults, matching the Streamlit sidebar
+DEFAULT_PARAMS = {
+    'num_inst': 5,
+    'num_retail': 50,
+    'num_stocks': 3,
+    'avg_volatility': 0.015,
+    'inst_aggression': 1.0,
+    'retail_fomo': 0.7,
+    'panic_factor': 0.7,
+    'accumulation_days': 20,
+    'pump_days': 10,
+    'distribution_days': 15,
+    'days': 120,
+}
+INTEGER_PARAMS = ('num_inst', 'num_retail', 'num_stocks', 'accumulation_days', 'pump_days',
+                  'distribution_days', 'days')
+
+# Modules whose source determines simulation results
+CODE_MODULES = ('market_simulator.py', 'market_signals.py', 'strategies.py', 'money_flow_store.py',
+                'ring_buffer.py', 'cohorts.py', 'profiling.py', 'monte_carlo.py', 'sweep.py')
+
+
+def build_simulation(params, seed=None):
+    """Build a MarketSimulator the way the Streamlit app does, from a parameter dict"""
+    params = {**DEFAULT_PARAMS, **params}
+    sim = MarketSimulator(seed)
+    rng = sim.rng
+    phase_lengths = (params['accumulation_days'], params['pump_days'], params['distribution_days'])
+    for name in STOCK_NAMES[:params['num_stocks']]:
+        vol = params['avg_volatility'] * (0.8 + rng.random() * 0.4)  # ±20% of avg_volatility
+        sim.add_stock(name, 25 + rng.random() * 175, vol)
+    for i in range(params['num_inst']):
+        sim.add_institutional_investor(f"Inst_{i}", 5000000 + rng.random() * 15000000,
+                                       aggression=params['inst_aggression'], phase_lengths=phase_lengths)
+    for i in range(params['num_retail']):
+        fomo = params['retail_fomo'] * (0.7 + rng.random() * 0.6)  # Variation in FOMO
+        sim.add_retail_investor(f"Retail_{i}", 10000 + rng.random() * 90000, fomo,
+                                panic_factor=params['panic_factor'])
+    return sim
+
+
+def grid(**axes):
+    """Cartesian product of parameter values, e.g. grid(num_inst=[5, 10], retail_fomo=[0.5, 1.0])"""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def latin_hypercube(n_points, bounds, seed=None):
+    """`n_points` Latin hypercube samples within {param: (low, high)} bounds.
+
+    Each parameter's range is cut into `n_points` strata and every stratum
+    is hit exactly once. Integer parameters are rounded.
+    """
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(n_points)]
+    for name, (low, high) in bounds.items():
+        strata = (rng.permutation(n_points) + rng.random(n_points)) / n_points
+        values = low + strata * (high - low)
+        for point, value in zip(points, values.tolist()):
+            point[name] = int(round(value)) if name in INTEGER_PARAMS else value
+    return points
+
+
+def code_version(modules=CODE_MODULES):
+    """Hash of the simulator source, so code changes invalidate cached results"""
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in modules:
+        with open(os.path.join(directory, module), 'rb') as f:
+            digest.update(module.encode())
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def result_key(params, seed, version):
+    """Content address of one run: hash of (full parameters, seed, code version)"""
+    payload = json.dumps({'params': {**DEFAULT_PARAMS, **params}, 'seed': seed, 'code': version},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Directory of .npz run summaries named by their result key"""
+
+    def __init__(self, directory=".sweep_cache"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        """(stock_names, summary) or None when the run has not been cached"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return data['stock_names'].tolist(), data['summary']
+
+    def put(self, key, stock_names, summary):
+        # Write then rename so concurrent sweeps never see a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, stock_names=np.array(stock_names), summary=summary)
+        os.replace(tmp_path, self._path(key))
+
+
+def _run_point(params, seed):
+    """Worker entry point: run one (parameters, seed) pair"""
+    sim = build_simulation(params, seed)
+    sim.run_simulation({**DEFAULT_PARAMS, **params}['days'])
+    return sim.money_flow.stock_names, summarize_run(sim)
+
+
+class SweepResult:
+    """Summaries of every (point, seed) run in a sweep"""
+
+    def __init__(self, points, seeds, runs, cache_hits):
+        self.points = points
+        self.seeds = seeds
+        self.runs = runs  # {(point index, seed): (stock_names, (metrics, stocks) summary)}
+        self.cache_hits = cache_hits
+
+    def to_frame(self):
+        """Long-format frame with one row per (point, seed, stock)"""
+        rows = []
+        for (index, seed), (stock_names, summary) in self.runs.items():
+            params = {**DEFAULT_PARAMS, **self.points[index]}
+            for j, stock_name in enumerate(stock_names):
+                row = {'point': index, 'seed': seed, **params, 'stock': stock_name}
+                row.update(zip(SUMMARY_METRICS, summary[:, j].tolist()))
+                rows.append(row)
+        return pd.DataFrame(rows).sort_values(['point', 'seed', 'stock'], ignore_index=True)
+
+
+def run_sweep(points, seeds=(0,), cache_dir=".sweep_cache", workers=None):
+    """Run every parameter point for every seed, reusing cached results.
+
+    Runs are keyed by `result_key`, so repeating a sweep, extending it with
+    new points or seeds, or overlapping it with another sweep only computes
+    the runs not seen before. Using the same seeds for every point gives
+    common random numbers across the sweep.
+    """
+    cache = ResultCache(cache_dir) if cache_dir else None
+    version = code_version()
+    runs = {}
+    pending = []
+    seeds = [int(seed) for seed in seeds]
+    for index, params in enumerate(points):
+        for seed in seeds:
+            key = result_key(params, seed, version)
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                runs[(index, seed)] = cached
+            else:
+                pending.append((index, seed, key))
+    cache_hits = len(runs)
+
+    workers = workers or os.cpu_count() or 1
+    params = [points[index] for index, _, _ in pending]
+    pending_seeds = [seed for _, seed, _ in pending]
+    if workers == 1 or len(pending) <= 1:
+        results = list(map(_run_point, params, pending_seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_point, params, pending_seeds,
+                                    chunksize=max(1, len(pending) // (workers * 4))))
+
+    for (index, seed, key), (stock_names, summary) in zip(pending, results):
+        runs[(index, seed)] = (stock_names, summary)
+        if cache is not None:
+            cache.put(key, stock_names, summary)
+
+    return SweepResult(points, seeds, runs, cache_hits)
+
+
+if __name__ == "__main__":
+    result = run_sweep(grid(num_inst=[2, 5, 10], retail_fomo=[0.4, 0.7, 1.0]), seeds=range(4))
+    print(f"{result.cache_hits} cached runs reused")
+    print(result.to_frame().groupby(['num_inst', 'retail_fomo'])['cum_wealth_transfer'].mean())
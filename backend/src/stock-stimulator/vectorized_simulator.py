@@ -0,0 +1,363 @@
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from money_flow_store import MoneyFlowStore, DayRecord
+from market_signals import MarketSignals, RETAIL_TREND_LOOKBACK
+from ring_buffer import RingBuffer
+from cohorts import bucket_retail_population
+from strategies import get_strategy, NO_TARGET
+from portfolio_ledger import PortfolioLedger
+from intraday import IntradaySimulator
+from event_log import EventLogWriter
+
+
+class VectorizedMarketSimulator:
+    """Structure-of-arrays variant of MarketSimulator.
+
+    Agent state lives in NumPy arrays and every agent's decision for a day is
+    evaluated as a handful of batched array operations, so the per-day cost no
+    longer grows with interpreted work per investor. The decision rules mirror
+    InstitutionalInvestor and RetailInvestor, so under a fixed seed the two
+    engines produce the same statistical behaviour.
+    """
+
+    def __init__(self, seed=None, signals=None):
+        self.rng = np.random.default_rng(seed)
+        self.signals = signals or MarketSignals()
+        self.snapshot = None  # MarketSnapshot for the day being simulated
+        self.profiler = None  # Optional SimulationProfiler
+        self.replay = None  # Optional PriceReplay supplying prices or shocks
+        self.shock_model = None  # Optional FactorShockModel for correlated noise
+        self.social_network = None  # Optional SocialNetwork over retail agents
+        self.ledger = None  # Optional PortfolioLedger, see enable_ledger
+        self.intraday = None  # Optional IntradaySimulator, see enable_intraday
+        self.event_log = None  # Optional EventLogWriter, see enable_event_log
+        # (agent rows, stock indices, demands) of the current day, collected only
+        # while a ledger or event log needs them; retail rows follow institutional ones
+        self._day_decisions = []
+        self.stocks = {}  # stock name -> column index
+        self.current_day = 0
+        self.start_date = datetime.now()
+        self.money_flow = None  # MoneyFlowStore, created on the first simulated day
+
+        # Stock state
+        self.prices = np.empty(0)
+        self.volatility = np.empty(0)
+        self.price_history = None  # RingBuffer of recent (stocks,) price rows
+        self.institutional_holdings = np.empty(0)
+        self.retail_holdings = np.empty(0)
+
+        # Institutional investor state
+        self.inst_names = []
+        self.inst_capital = np.empty(0)
+        self.inst_aggression = np.empty(0)
+        # Strategy name -> {'members': investor indices, 'state': per-investor arrays}
+        self.inst_groups = {}
+
+        # Retail investor state
+        self.retail_names = []
+        self.retail_capital = np.empty(0)
+        self.retail_fomo = np.empty(0)
+        self.retail_panic = np.empty(0)
+        self.retail_weight = np.empty(0)  # Investors represented by each agent (cohort mode)
+        self._day_fomo = self.retail_fomo  # Today's FOMO after social influence, set by _retail_demand
+
+    def add_stock(self, name, price, volatility):
+        self.stocks[name] = len(self.stocks)
+        self.prices = np.append(self.prices, float(price))
+        self.volatility = np.append(self.volatility, float(volatility))
+        self.institutional_holdings = np.append(self.institutional_holdings, 0.0)
+        self.retail_holdings = np.append(self.retail_holdings, 0.0)
+        self.price_history = RingBuffer(self.signals.window, self.prices.shape)
+        self.price_history.append(self.prices)
+
+    def add_institutional_investor(self, name, capital, strategy="pump_and_dump", aggression=1.0,
+                                   phase_lengths=None):
+        kernel = get_strategy(strategy)
+        group = self.inst_groups.get(strategy)
+        if group is None:
+            group = self.inst_groups[strategy] = {
+                'members': np.empty(0, dtype=np.int64), 'state': kernel.init_state(0, self.rng)}
+        group['members'] = np.append(group['members'], len(self.inst_names))
+        state = kernel.init_state(1, self.rng)
+        if phase_lengths is not None:
+            if 'phase_lengths' not in state:
+                raise ValueError(f"Strategy {strategy} has no phase lengths")
+            state['phase_lengths'][0] = phase_lengths
+        for key, values in state.items():
+            group['state'][key] = np.concatenate([group['state'][key], values])
+        self.inst_names.append(name)
+        self.inst_capital = np.append(self.inst_capital, float(capital))
+        self.inst_aggression = np.append(self.inst_aggression, float(aggression))
+
+    def add_retail_investor(self, name, capital, fomo_factor=0.5, weight=1, panic_factor=0.7):
+        self.add_retail_investors([fomo_factor], capital, names=[name], weights=[weight],
+                                  panic_factors=panic_factor)
+
+    def enable_ledger(self, participation=0.01):
+        """Track per-investor positions and P&L (see MarketSimulator.enable_ledger).
+
+        Ledger rows are the institutional investors followed by the retail
+        investors, in the order they were added.
+        """
+        self.ledger = PortfolioLedger(self.inst_names + self.retail_names, list(self.stocks),
+                                      np.concatenate([self.inst_capital, self.retail_capital]))
+        self.ledger_participation = participation
+        # Dollar size of a full-demand order per ledger row
+        self._ledger_notional = np.concatenate(
+            [self.inst_capital, self.retail_capital * self.retail_weight]) * participation
+        return self.ledger
+
+    def enable_event_log(self, path, decisions=True, overwrite=False):
+        """Append every day's prices, flows and agent decisions to a binary log (see event_log.py)"""
+        self.event_log = EventLogWriter(path, list(self.stocks), self.inst_names, self.retail_names,
+                                        self.start_date, decisions, overwrite=overwrite)
+        return self.event_log
+
+    def _record_decisions(self, day):
+        if self._day_decisions:
+            rows, stocks, demands = (np.concatenate(parts) for parts in zip(*self._day_decisions))
+            self._day_decisions = []
+        else:
+            rows = stocks = np.zeros(0, dtype=np.intp)
+            demands = np.zeros(0)
+
+        if self.ledger is not None:
+            # Every decision fills at today's close
+            prices = self.prices[stocks]
+            self.ledger.apply_fills(rows, stocks, demands * self._ledger_notional[rows] / prices, prices)
+            self.ledger.mark(self.prices)
+
+        if self.event_log is not None:
+            n_inst = len(self.inst_names)
+            inst = rows < n_inst
+            retail_rows = rows[~inst] - n_inst
+            self.event_log.write_day(
+                self.current_day, day,
+                inst_decisions=(rows[inst], stocks[inst], demands[inst], self.inst_capital[rows[inst]]),
+                retail_decisions=(retail_rows, stocks[~inst], demands[~inst], self.retail_weight[retail_rows]))
+
+    def enable_intraday(self, steps_per_day=390, step_seconds=60, seed=None, retail_feedback=0.5):
+        """Step every simulated day's session at sub-day resolution (see IntradaySimulator).
+
+        Call after adding all stocks. Daily closes and flows then come from
+        the intraday steps. Without a seed the session generator is spawned
+        from the simulator's seed, so runs stay reproducible.
+        """
+        if seed is None:
+            seed = self.rng.bit_generator.seed_seq.spawn(1)[0]
+        self.intraday = IntradaySimulator(list(self.stocks), steps_per_day, step_seconds, seed=seed,
+                                          retail_feedback=retail_feedback)
+        return self.intraday
+
+    def add_retail_cohorts(self, fomo_factors, capital=100000, n_cohorts=256):
+        """Add a large retail population as weighted FOMO cohorts (see cohorts.py)"""
+        cohorts = bucket_retail_population(fomo_factors, n_cohorts, capital)
+        start = len(self.retail_names)
+        names = [f"Cohort_{i}" for i in range(start, start + len(cohorts))]
+        self.add_retail_investors(cohorts.fomo, cohorts.capital, names=names, weights=cohorts.size)
+        return cohorts
+
+    def add_retail_investors(self, fomo_factors, capital, names=None, weights=1, panic_factors=0.7):
+        """Add a whole population of retail investors in one call"""
+        fomo_factors = np.asarray(fomo_factors, dtype=float)
+        count = len(fomo_factors)
+        start = len(self.retail_names)
+        if names is None:
+            names = [f"Retail_{i}" for i in range(start, start + count)]
+        self.retail_names.extend(names)
+        self.retail_capital = np.concatenate(
+            [self.retail_capital, np.broadcast_to(np.asarray(capital, dtype=float), (count,))])
+        self.retail_fomo = np.concatenate([self.retail_fomo, fomo_factors])
+        self.retail_panic = np.concatenate(
+            [self.retail_panic, np.broadcast_to(np.asarray(panic_factors, dtype=float), (count,))])
+        self.retail_weight = np.concatenate(
+            [self.retail_weight, np.broadcast_to(np.asarray(weights, dtype=float), (count,))])
+
+    def _institutional_demand(self):
+        """Run each registered strategy's kernel over all of its investors"""
+        n_stocks = len(self.stocks)
+        demand = np.zeros(n_stocks)
+        if n_stocks == 0:
+            return demand
+        for strategy, group in self.inst_groups.items():
+            targets, actions = get_strategy(strategy).step(group['state'], self.snapshot, self.rng, n_stocks)
+            actions = actions * self.inst_aggression[group['members']]
+            active = targets != NO_TARGET
+            demand += np.bincount(targets[active], weights=actions[active], minlength=n_stocks)
+            if self.ledger is not None or self.event_log is not None:
+                self._day_decisions.append((group['members'][active], targets[active], actions[active]))
+        return demand
+
+    def _retail_demand(self):
+        """Batched version of RetailInvestor.decide_action"""
+        n_stocks = len(self.stocks)
+        count = len(self.retail_fomo)
+        network = self.social_network
+        # Neighbour sentiment scales each investor's base FOMO for today
+        self._day_fomo = fomo = self.retail_fomo if network is None or count == 0 else network.fomo(self.retail_fomo)
+        if count == 0 or n_stocks == 0:
+            return np.zeros(n_stocks)
+        trend = self.snapshot.trend[RETAIL_TREND_LOOKBACK]
+        if np.isnan(trend).any():
+            # Not enough history: every investor focuses on a stock with zero demand
+            if network is not None:
+                network.observe(np.zeros(count))
+            return np.zeros(n_stocks)
+
+        order = np.arange(n_stocks)
+
+        # The response is monotone in the trend within each regime, so every
+        # investor's strongest candidate per regime is the same stock.
+        rising = trend > 0.05
+        falling = trend < -0.05
+        neutral = ~(rising | falling)
+
+        candidates = []
+        if rising.any():
+            idx = order[rising][np.argmax(trend[rising])]
+            candidates.append((idx, np.minimum(trend[idx] * fomo, 1.0)))
+        if falling.any():
+            idx = order[falling][np.argmin(trend[falling])]
+            candidates.append((idx, np.maximum(trend[idx] * self.retail_panic, -1.0)))
+        if neutral.any():
+            idx = order[neutral][np.argmax(np.abs(trend[neutral]))]
+            candidates.append((idx, np.full(count, trend[idx] * 0.2)))
+
+        # Match max() over stocks in insertion order: ties go to the lower index
+        candidates.sort(key=lambda c: c[0])
+        stock_idx = np.array([c[0] for c in candidates])
+        values = np.stack([c[1] for c in candidates])
+        choice = np.argmax(np.abs(values), axis=0)
+        chosen = values[choice, np.arange(count)]
+        if network is not None:
+            network.observe(chosen)
+        if self.ledger is not None or self.event_log is not None:
+            self._day_decisions.append((len(self.inst_names) + np.arange(count), stock_idx[choice], chosen))
+        return np.bincount(stock_idx[choice], weights=chosen * self.retail_weight, minlength=n_stocks)
+
+    def simulate_day(self):
+        return self._step(record=True)
+
+    def iter_days(self, days=None, record=True):
+        """Yield each day's DayRecord as soon as it is simulated.
+
+        Runs forever when `days` is None. With record=False the days are not
+        kept in the output store, so memory stays bounded however long the
+        run is.
+        """
+        if record and days is not None:
+            self._output_store().reserve(days)
+        simulated = 0
+        while days is None or simulated < days:
+            day = self._step(record)
+            simulated += 1
+            yield day
+
+    def _step(self, record):
+        """Advance the market by one day and return that day's record"""
+        profiler = self.profiler
+        if profiler is not None:
+            phase_start = time.perf_counter()
+
+        self.current_day += 1
+        date = self.start_date + timedelta(days=self.current_day)
+
+        # Indicators are computed once per day and read by every strategy
+        self.snapshot = self.compute_snapshot()
+        if profiler is not None:
+            phase_start = self._end_phase('signals', phase_start)
+
+        institutional_demands = self._institutional_demand()
+        if profiler is not None:
+            phase_start = self._end_phase('institutional', phase_start)
+
+        retail_demands = self._retail_demand()
+        if profiler is not None:
+            phase_start = self._end_phase('retail', phase_start)
+
+        n_inst = len(self.inst_names)
+        n_retail = self.retail_weight.sum()
+        inst_demand = institutional_demands / n_inst if n_inst else np.zeros(len(self.stocks))
+        retail_demand = retail_demands / n_retail if n_retail else np.zeros(len(self.stocks))
+
+        intraday = self.intraday
+        # Same price dynamics as Stock.update_price, for all stocks at once
+        if self.replay is not None and self.replay.mode == 'prices':
+            if intraday is not None:
+                raise ValueError("Intraday mode needs the simulator's own price dynamics, not replayed prices")
+            self.prices = np.maximum(0.01, self.replay.row(self.current_day, list(self.stocks)))
+        else:
+            demand_factor = (inst_demand * 2 + retail_demand) / 3
+            if self.replay is not None:
+                noise = self.replay.row(self.current_day, list(self.stocks))
+            elif self.shock_model is not None:
+                noise = self.shock_model.next(self.rng, list(self.stocks)) * (self.volatility / 2)
+            else:
+                noise = self.rng.normal(0, self.volatility / 2)
+            if intraday is not None:
+                fomo = np.average(self._day_fomo, weights=self.retail_weight) if len(self._day_fomo) else 0.0
+                self.prices, inst_flow, retail_flow, inst_demand, retail_demand = intraday.simulate_day(
+                    date, self.prices, self.volatility, inst_demand, retail_demand, noise, fomo)
+            else:
+                self.prices = np.maximum(0.01, self.prices + self.prices * (demand_factor * self.volatility + noise))
+        self.price_history.append(self.prices)
+        if profiler is not None:
+            phase_start = self._end_phase('price_update', phase_start)
+
+        if intraday is None:
+            inst_flow = inst_demand * self.prices * 100000
+            retail_flow = retail_demand * self.prices * 10000
+        self.institutional_holdings += inst_flow
+        self.retail_holdings += retail_flow
+
+        day = DayRecord(date, self.prices, inst_flow, retail_flow, inst_demand, retail_demand)
+        if self.ledger is not None or self.event_log is not None:
+            self._record_decisions(day)
+        if record:
+            self._output_store().append(*day)
+        if profiler is not None:
+            self._end_phase('bookkeeping', phase_start)
+        return day
+
+    def _end_phase(self, phase, phase_start):
+        now = time.perf_counter()
+        self.profiler.record(phase, now - phase_start, self.current_day)
+        return now
+
+    def compute_snapshot(self):
+        window = self.price_history.last(self.signals.window)
+        return self.signals.compute(list(self.stocks.keys()), window)
+
+    def _output_store(self):
+        if self.money_flow is None:
+            self.money_flow = MoneyFlowStore(self.stocks.keys())
+        return self.money_flow
+
+    def get_data_frame(self):
+        return self._output_store().to_frame()
+
+    def run_simulation(self, days):
+        self._output_store().reserve(days)
+        if self.intraday is not None:
+            self.intraday.reserve(days)
+        for _ in range(days):
+            self.simulate_day()
+        return self.get_data_frame()
+
+
+def create_sample_simulation(seed=None):
+    """Vectorized counterpart of market_simulator.create_sample_simulation"""
+    sim = VectorizedMarketSimulator(seed)
+
+    sim.add_stock("TECH", 100.0, 0.02)
+    sim.add_stock("ENERGY", 50.0, 0.015)
+    sim.add_stock("FINANCE", 75.0, 0.01)
+
+    for i in range(5):
+        sim.add_institutional_investor(f"Inst_{i}", 10000000)
+
+    # Retail investors with FOMO factors between 0.3 and 1.0
+    sim.add_retail_investors(0.3 + sim.rng.random(50) * 0.7, 100000)
+
+    return sim
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulator modules are flat files imported by name, as the apps do
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'stock-stimulator'))
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+import market_simulator
+import vectorized_simulator
+from checkpoint import checkpoint_simulation, restore_simulation, fork_simulation
+from shock_models import SectorShockModel
+
+ENGINES = [market_simulator.create_sample_simulation, vectorized_simulator.create_sample_simulation]
+
+
+def create_with_sector_shocks(create, seed):
+    sim = create(seed)
+    stock_names = list(sim.stocks)
+    sim.shock_model = SectorShockModel(stock_names, ['tech', 'energy', 'finance'][:len(stock_names)])
+    return sim
+
+
+@pytest.mark.parametrize('create', ENGINES)
+@pytest.mark.parametrize('sector_shocks', [False, True])
+def test_resume_matches_uninterrupted_run(create, sector_shocks):
+    sim = create_with_sector_shocks(create, 3) if sector_shocks else create(3)
+    sim.run_simulation(20)
+    blob = checkpoint_simulation(sim)
+    sim.run_simulation(20)
+
+    resumed = restore_simulation(blob)
+    resumed.run_simulation(20)
+    pd.testing.assert_frame_equal(resumed.get_data_frame(), sim.get_data_frame())
+
+
+@pytest.mark.parametrize('create', ENGINES)
+def test_unseeded_fork_replays_parent(create):
+    sim = create_with_sector_shocks(create, 3)
+    sim.run_simulation(20)
+    branch = fork_simulation(sim)
+    sim.run_simulation(10)
+    branch.run_simulation(10)
+    pd.testing.assert_frame_equal(branch.get_data_frame(), sim.get_data_frame())
+
+
+@pytest.mark.parametrize('create', ENGINES)
+def test_seeded_forks_diverge_on_the_next_day(create):
+    sim = create_with_sector_shocks(create, 3)
+    sim.run_simulation(20)
+    branches = [fork_simulation(sim, seed=seed) for seed in (1, 1, 2)]
+    for branch in branches:
+        branch.run_simulation(1)
+    sim.run_simulation(1)
+
+    prices = [branch.get_data_frame().filter(like='_price').iloc[-1].to_numpy() for branch in branches]
+    parent = sim.get_data_frame().filter(like='_price').iloc[-1].to_numpy()
+    np.testing.assert_array_equal(prices[0], prices[1])  # Same seed, same branch
+    assert not np.allclose(prices[0], prices[2])
+    assert not np.allclose(prices[0], parent)
+
+
+def test_seeded_fork_drops_buffered_shocks():
+    sim = create_with_sector_shocks(vectorized_simulator.create_sample_simulation, 3)
+    sim.run_simulation(20)  # Leaves most of a block of shocks buffered
+    branch = fork_simulation(sim, seed=1)
+    stock_names = list(sim.stocks)
+    assert not np.allclose(branch.shock_model.next(branch.rng, stock_names),
+                           sim.shock_model.next(sim.rng, stock_names))
@@ -0,0 +1,24 @@
+import numpy as np
+import market_simulator
+import vectorized_simulator
+
+SEEDS = range(80)
+DAYS = 200
+
+
+def _run_statistics(create, seed):
+    """Mean institutional demand and daily log-return volatility of one seeded run"""
+    data = create(seed).run_simulation(DAYS)
+    demand = data[[col for col in data.columns if col.endswith('_inst_demand')]].to_numpy()
+    prices = data[[col for col in data.columns if col.endswith('_price')]].to_numpy()
+    return demand.mean(), np.log(prices[1:] / prices[:-1]).std()
+
+
+def test_engines_have_same_demand_and_return_statistics():
+    object_model = np.array([_run_statistics(market_simulator.create_sample_simulation, seed) for seed in SEEDS])
+    vectorized = np.array([_run_statistics(vectorized_simulator.create_sample_simulation, seed) for seed in SEEDS])
+    for j, name in enumerate(('inst_demand', 'return_volatility')):
+        diff = object_model[:, j].mean() - vectorized[:, j].mean()
+        stderr = np.sqrt((object_model[:, j].var(ddof=1) + vectorized[:, j].var(ddof=1)) / len(SEEDS))
+        # Independent seeded runs of each engine: means must agree within 4 standard errors
+        assert abs(diff) < 4 * stderr, f"{name}: engines differ by {diff / stderr:.1f} standard errors"
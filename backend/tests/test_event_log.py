@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+import market_simulator
+import vectorized_simulator
+from checkpoint import checkpoint_simulation, restore_simulation, fork_simulation
+from event_log import EventLog
+
+ENGINES = [market_simulator.create_sample_simulation, vectorized_simulator.create_sample_simulation]
+
+
+@pytest.mark.parametrize('create', ENGINES)
+def test_log_round_trip_matches_recorded_frame(create, tmp_path):
+    sim = create(0)
+    sim.enable_event_log(str(tmp_path / 'run.log'))
+    data = sim.run_simulation(15)
+    sim.event_log.close()
+    logged = EventLog(str(tmp_path / 'run.log')).to_frame()
+    pd.testing.assert_frame_equal(logged.drop(columns='date'), data.drop(columns='date'))
+
+
+@pytest.mark.parametrize('create', ENGINES)
+def test_restore_while_parent_keeps_running(create, tmp_path):
+    parent_path = str(tmp_path / 'parent.log')
+    sim = create(0)
+    sim.enable_event_log(parent_path)
+    sim.run_simulation(10)
+    blob = checkpoint_simulation(sim)
+    sim.run_simulation(10)
+    sim.event_log.flush()
+
+    # Restoring must leave the parent's log alone
+    restored = restore_simulation(blob)
+    sim.run_simulation(5)
+    sim.event_log.close()
+    parent = EventLog(parent_path)
+    assert list(parent.days) == list(range(1, 26))
+    assert (np.diff(parent.events['day'].astype(np.int64)) >= 0).all()
+    pd.testing.assert_frame_equal(parent.to_frame().drop(columns='date'),
+                                  sim.get_data_frame().drop(columns='date'))
+
+    # A detached writer refuses to log until it gets its own file
+    with pytest.raises(RuntimeError):
+        restored.run_simulation(1)
+    restored = restore_simulation(blob)
+    with pytest.raises(ValueError):
+        restored.event_log.resume(parent_path)
+    restored.event_log.resume(str(tmp_path / 'restored.log'))
+    restored.run_simulation(3)
+    restored.event_log.close()
+    log = EventLog(str(tmp_path / 'restored.log'))
+    assert list(log.days) == list(range(1, 14))
+    pd.testing.assert_frame_equal(log.to_frame().drop(columns='date'),
+                                  restored.get_data_frame().drop(columns='date'))
+
+
+def test_restore_without_log_file(tmp_path):
+    sim = vectorized_simulator.create_sample_simulation(0)
+    sim.enable_event_log(str(tmp_path / 'gone.log'))
+    sim.run_simulation(5)
+    blob = checkpoint_simulation(sim)
+    sim.event_log.close()
+    (tmp_path / 'gone.log').unlink()
+    restored = restore_simulation(blob)  # e.g. on another machine
+    assert restored.current_day == 5
+
+
+def test_fork_needs_its_own_log(tmp_path):
+    sim = market_simulator.create_sample_simulation(0)
+    sim.enable_event_log(str(tmp_path / 'parent.log'))
+    sim.run_simulation(5)
+    with pytest.raises(ValueError):
+        fork_simulation(sim, seed=1)
+    branch = fork_simulation(sim, seed=1, event_log_path=str(tmp_path / 'branch.log'))
+    branch.run_simulation(3)
+    branch.event_log.close()
+    assert list(EventLog(str(tmp_path / 'branch.log')).days) == list(range(1, 9))
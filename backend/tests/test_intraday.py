@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+import market_simulator
+import vectorized_simulator
+from social_network import SocialNetwork
+
+ENGINES = [market_simulator.create_sample_simulation, vectorized_simulator.create_sample_simulation]
+
+
+@pytest.mark.parametrize('create', ENGINES)
+def test_session_uses_network_adjusted_fomo(create):
+    sim = create(0)
+    n_retail = len(getattr(sim, 'retail_investors', None) or sim.retail_names)
+    network = sim.social_network = SocialNetwork.random(n_retail, mean_degree=4, rng=np.random.default_rng(1))
+    network.sentiment[:] = 0.8  # Herding is already under way, so today's FOMO differs from the base
+    intraday = sim.enable_intraday(steps_per_day=10, seed=2)
+
+    day_fomo = []
+    network_fomo = network.fomo
+    network.fomo = lambda base: day_fomo.append(network_fomo(base)) or day_fomo[-1]
+    session_fomo = []
+    simulate_day = intraday.simulate_day
+    intraday.simulate_day = lambda *args: session_fomo.append(args[-1]) or simulate_day(*args)
+    sim.run_simulation(15)
+
+    weights = ([investor.weight for investor in sim.retail_investors] if hasattr(sim, 'retail_investors')
+               else sim.retail_weight)
+    assert len(session_fomo) == len(day_fomo) == 15
+    np.testing.assert_allclose(session_fomo, [np.average(fomo, weights=weights) for fomo in day_fomo])
@@ -0,0 +1,21 @@
+from order_book import BUY, SELL, OrderBook
+
+
+def test_cancel_after_fill_does_not_touch_reused_order():
+    book = OrderBook()
+    mine = book.submit(BUY, 10.00, 100, owner='me')
+    assert book.submit(SELL, 10.00, 100, owner='seller') is None  # Fills mine; its object goes back to the pool
+
+    theirs = book.submit(BUY, 9.00, 50, owner='them')
+    assert theirs[0] is mine[0]  # The pool hands the same object out again
+    assert not book.cancel(mine)
+    assert book.best_bid() == 9.00
+
+
+def test_cancel_resting_order():
+    book = OrderBook()
+    order_id = book.submit(SELL, 10.00, 100)
+    book.submit(SELL, 10.50, 100)
+    assert book.cancel(order_id)
+    assert not book.cancel(order_id)
+    assert book.best_ask() == 10.50
@@ -0,0 +1,58 @@
+import numpy as np
+from portfolio_ledger import PortfolioLedger
+
+
+def make_ledger():
+    return PortfolioLedger(['alice', 'bob'], ['TECH', 'ENERGY'], 10000.0)
+
+
+def test_adding_blends_average_cost_and_reducing_keeps_it():
+    ledger = make_ledger()
+    ledger.apply_fills([0], [0], [10], [100.0])
+    ledger.apply_fills([0], [0], [30], [120.0])
+    assert ledger.positions[0, 0] == 40
+    assert ledger.avg_cost[0, 0] == 115.0
+
+    ledger.apply_fills([0], [0], [-15], [130.0])
+    assert ledger.positions[0, 0] == 25
+    assert ledger.avg_cost[0, 0] == 115.0
+    assert ledger.realized[0, 0] == 15 * 15.0
+    assert ledger.cash[0] == 10000 - 1000 - 3600 + 1950
+
+
+def test_flip_realizes_the_old_position_and_opens_at_the_trade_price():
+    ledger = make_ledger()
+    ledger.apply_fills([1], [1], [10], [50.0])
+    ledger.apply_fills([1], [1], [-25], [40.0])
+    assert ledger.positions[1, 1] == -15
+    assert ledger.avg_cost[1, 1] == 40.0
+    assert ledger.realized[1, 1] == -100.0
+
+    # Covering the short at a lower price is a gain and leaves a flat position
+    ledger.apply_fills([1], [1], [15], [30.0])
+    assert ledger.positions[1, 1] == 0
+    assert ledger.avg_cost[1, 1] == 0.0
+    assert ledger.realized[1, 1] == -100.0 + 150.0
+
+
+def test_same_day_round_trip_realizes_at_average_prices():
+    ledger = make_ledger()
+    # Unsorted investors take the aggregating path
+    ledger.apply_fills([0, 1, 0, 0], [0, 0, 0, 0], [10, 5, -10, 10], [100.0, 100.0, 110.0, 104.0])
+    assert ledger.positions[0, 0] == 10
+    assert ledger.avg_cost[0, 0] == 102.0
+    assert ledger.realized[0, 0] == 10 * (110.0 - 102.0)
+    assert ledger.cash[0] == 10000 - 1000 + 1100 - 1040
+    assert ledger.positions[1, 0] == 5
+
+
+def test_equity_and_pnl_add_up():
+    ledger = make_ledger()
+    ledger.apply_fills([0, 1], [0, 1], [10, -20], [100.0, 50.0])
+    ledger.apply_fills([0], [0], [-4], [110.0])
+    ledger.mark([105.0, 45.0])
+
+    np.testing.assert_allclose(ledger.unrealized, [[6 * 5.0, 0.0], [0.0, -20 * -5.0]])
+    np.testing.assert_allclose(ledger.pnl(), ledger.realized.sum(axis=1) + ledger.unrealized.sum(axis=1))
+    np.testing.assert_allclose(ledger.to_frame()['total_pnl'], [4 * 10.0 + 30.0, 100.0])
+    np.testing.assert_allclose(ledger.group_pnl([1]), [0.0, 100.0])